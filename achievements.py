@@ -0,0 +1,141 @@
+"""Moteur de succès alimenté par le règlement des paris
+
+À chaque partie, UserStats.record() renvoie les compteurs du joueur avant et
+après la partie. Pour chaque compteur qui a augmenté, seuls les seuils compris
+dans l'intervalle (avant, après] sont testés, par recherche dichotomique dans
+une table triée : le travail par pari ne dépend pas du nombre de succès.
+"""
+from bisect import bisect_right
+
+from ledger import bet_settled
+from models import db, Achievement, User, UserStats, user_achievements, insert_ignore
+
+# Succès créés au premier démarrage (condition_type = compteur de UserStats.counters())
+DEFAULT_ACHIEVEMENTS = [
+    {'name': 'Premier pas', 'description': 'Joue ta première partie', 'icon': '🎮', 'reward': 100,
+     'condition_type': 'total_games', 'condition_value': 1},
+    {'name': 'Gagnant', 'description': 'Gagne 10 parties', 'icon': '🏆', 'reward': 500,
+     'condition_type': 'total_wins', 'condition_value': 10},
+    {'name': 'Chanceux', 'description': 'Gagne avec un multiplicateur x50+', 'icon': '🍀', 'reward': 1000,
+     'condition_type': 'max_multiplier', 'condition_value': 50},
+    {'name': 'Millionnaire', 'description': 'Atteins 10,000$', 'icon': '💰', 'reward': 2000,
+     'condition_type': 'peak_balance', 'condition_value': 10000},
+    {'name': 'Série de victoires', 'description': 'Gagne 5 parties d\'affilée', 'icon': '🔥', 'reward': 1500,
+     'condition_type': 'win_streak', 'condition_value': 5},
+]
+
+
+class AchievementEngine:
+    """Seuils des succès par compteur, chargés une fois par worker"""
+    
+    def __init__(self):
+        self._thresholds = None
+    
+    def reload(self):
+        self._thresholds = None
+    
+    def thresholds(self):
+        """{condition_type: ([seuils triés], [(id, récompense) alignés])}"""
+        if self._thresholds is None:
+            thresholds = {}
+            rows = Achievement.query.filter(Achievement.condition_type.isnot(None)) \
+                .order_by(Achievement.condition_value).all()
+            for achievement in rows:
+                values, entries = thresholds.setdefault(achievement.condition_type, ([], []))
+                values.append(achievement.condition_value)
+                entries.append((achievement.id, achievement.reward or 0))
+            self._thresholds = thresholds
+        return self._thresholds
+    
+    def evaluate(self, user, before, after):
+        """Débloque les succès dont le seuil vient d'être franchi ; renvoie leurs identifiants"""
+        thresholds = self.thresholds()
+        unlocked = []
+        
+        for counter, new_value in after.items():
+            old_value = before.get(counter, 0)
+            if counter not in thresholds or new_value <= old_value:
+                continue
+            values, entries = thresholds[counter]
+            for achievement_id, reward in entries[bisect_right(values, old_value):bisect_right(values, new_value)]:
+                if self.award(user, achievement_id, reward):
+                    unlocked.append(achievement_id)
+        
+        return unlocked
+    
+    @staticmethod
+    def award(user, achievement_id, reward):
+        """Enregistre le succès (une seule fois grâce à la clé primaire) et verse la récompense"""
+        if not insert_ignore(user_achievements, user_id=user.id, achievement_id=achievement_id):
+            return False
+        if reward:
+            user.add_money(reward)
+        return True
+    
+    
+    def backfill(self):
+        """Débloque les succès déjà mérités par les résumés existants (seuils dans (0, compteur]) ; idempotent
+
+        Le moteur ne teste que les seuils franchis par une nouvelle partie : un
+        résumé recalculé depuis l'historique (db seed, rebuild-stats) doit être
+        rattrapé une fois. Renvoie le nombre de succès débloqués.
+        """
+        thresholds = self.thresholds()
+        unlocked = set(db.session.query(user_achievements.c.user_id, user_achievements.c.achievement_id).all())
+        awarded = 0
+        
+        for summary in UserStats.query.yield_per(1000):
+            user = None
+            for counter, value in summary.counters().items():
+                if counter not in thresholds or not value or value <= 0:
+                    continue
+                values, entries = thresholds[counter]
+                for achievement_id, reward in entries[:bisect_right(values, value)]:
+                    if (summary.user_id, achievement_id) in unlocked:
+                        continue
+                    user = user or db.session.get(User, summary.user_id)
+                    if self.award(user, achievement_id, reward):
+                        awarded += 1
+        
+        db.session.commit()
+        return awarded
+
+
+engine = AchievementEngine()
+
+
+@bet_settled.connect
+def on_bet_settled(user, history, before, after, **extra):
+    return engine.evaluate(user, before, after)
+
+
+def achievements_for(user_id):
+    """Tous les succès, avec leur date de déblocage pour le joueur"""
+    unlocked = dict(db.session.query(user_achievements.c.achievement_id, user_achievements.c.unlocked_at)
+                    .filter(user_achievements.c.user_id == user_id).all())
+    return [{
+        'id': achievement.id,
+        'name': achievement.name,
+        'description': achievement.description,
+        'icon': achievement.icon,
+        'reward': achievement.reward,
+        'unlocked': achievement.id in unlocked,
+        'unlocked_at': unlocked[achievement.id].isoformat() if achievement.id in unlocked else None
+    } for achievement in Achievement.query.order_by(Achievement.id).all()]
+
+
+def seed_achievements():
+    """Crée les succès par défaut et complète les conditions des bases créées avant le moteur"""
+    existing = {achievement.name: achievement for achievement in Achievement.query.all()}
+    created = 0
+    for definition in DEFAULT_ACHIEVEMENTS:
+        achievement = existing.get(definition['name'])
+        if achievement is None:
+            db.session.add(Achievement(**definition))
+            created += 1
+        elif achievement.condition_type is None:
+            achievement.condition_type = definition['condition_type']
+            achievement.condition_value = definition['condition_value']
+    db.session.commit()
+    engine.reload()
+    return created
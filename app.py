@@ -1,28 +1,151 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, stream_with_context
+from flask.cli import AppGroup
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
-from datetime import datetime, date, timedelta
-import random
+from datetime import datetime, timedelta
+import click
+import secrets
 import os
 import json
+import csv
+import io
+import base64
+
+from database import database_uri, engine_options, sqlite_pragmas, install_sqlite_pragmas, upgrade_schema
 
 # Créer l'app Flask AVANT d'importer les modèles
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-very-secret-2024')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///casinoeuil.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
+
+# Money Clicker : cadence maximale acceptée et rafale maximale (en secondes de clics)
+app.config['CLICKER_MAX_CPS'] = 20
+app.config['CLICKER_BURST_SECONDS'] = 2
+
+# Parties en cours stockées côté serveur (memory, sql ou redis) et abandonnées après TTL secondes
+app.config['GAME_STATE_BACKEND'] = os.environ.get('GAME_STATE_BACKEND', 'sql')
+app.config['GAME_STATE_TTL'] = int(os.environ.get('GAME_STATE_TTL', 3600))
+app.config['GAME_STATE_REDIS_URL'] = os.environ.get('GAME_STATE_REDIS_URL', 'redis://localhost:6379/0')
+
+# Cache des stats du profil (secondes, 0 pour désactiver)
+app.config['USER_STATS_CACHE_TTL'] = int(os.environ.get('USER_STATS_CACHE_TTL', 10))
+
+# Hachage des mots de passe : méthode werkzeug, processus dédiés par worker, file d'attente max
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_MAX_PENDING'] = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 8))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+
+# Cache des identités lues par load_user (secondes, 0 pour désactiver)
+app.config['USER_IDENTITY_CACHE_TTL'] = int(os.environ.get('USER_IDENTITY_CACHE_TTL', 60))
+
+# Classements : taille servie, rechargement depuis la base et cache du rang du joueur (secondes)
+app.config['LEADERBOARD_SIZE'] = int(os.environ.get('LEADERBOARD_SIZE', 50))
+app.config['LEADERBOARD_REFRESH'] = float(os.environ.get('LEADERBOARD_REFRESH', 5))
+app.config['LEADERBOARD_RANK_TTL'] = float(os.environ.get('LEADERBOARD_RANK_TTL', 5))
+
+# Historique des parties écrit par lots en arrière-plan (write-behind, désactivé par défaut)
+app.config['GAME_HISTORY_WRITE_BEHIND'] = os.environ.get('GAME_HISTORY_WRITE_BEHIND', '0') == '1'
+app.config['GAME_HISTORY_BATCH_SIZE'] = int(os.environ.get('GAME_HISTORY_BATCH_SIZE', 500))
+app.config['GAME_HISTORY_FLUSH_MS'] = int(os.environ.get('GAME_HISTORY_FLUSH_MS', 200))
+app.config['GAME_HISTORY_QUEUE_SIZE'] = int(os.environ.get('GAME_HISTORY_QUEUE_SIZE', 10000))
+
+# Compteurs globaux versés en base toutes les N secondes (0 : dans la transaction de la requête)
+app.config['GLOBAL_STATS_FLUSH_SECONDS'] = float(os.environ.get('GLOBAL_STATS_FLUSH_SECONDS', 5))
+
+# Canal SSE : débit max (un tour par intervalle), relecture pour les autres workers, durée max d'une connexion,
+# flux simultanés par worker (chacun occupe un thread ; sous gunicorn, dérivé de GUNICORN_THREADS par gunicorn.conf.py)
+app.config['STREAM_INTERVAL'] = float(os.environ.get('STREAM_INTERVAL', 0.5))
+app.config['STREAM_POLL_SECONDS'] = float(os.environ.get('STREAM_POLL_SECONDS', 2))
+app.config['STREAM_MAX_SECONDS'] = int(os.environ.get('STREAM_MAX_SECONDS', 60))
+app.config['STREAM_MAX_SUBSCRIBERS'] = int(os.environ.get('STREAM_MAX_SUBSCRIBERS', 24))
+
+# GET conditionnels : ETag tirés des compteurs de version en base (0 = désactivés) ; compression des JSON
+app.config['ETAG_ENABLED'] = os.environ.get('ETAG_ENABLED', '1') == '1'
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 512))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+# Tirages des jeux : 'pool' (CSPRNG par blocs) ou 'fair' (HMAC de graines, vérifiable par le joueur)
+app.config['RNG_MODE'] = os.environ.get('RNG_MODE', 'pool')
+app.config['RNG_POOL_BYTES'] = int(os.environ.get('RNG_POOL_BYTES', 65536))
+
+# Agrégats de l'historique (flask rollup-history) : parties lues par lot, âge minimal d'une partie agrégée (s)
+app.config['ROLLUP_BATCH_SIZE'] = int(os.environ.get('ROLLUP_BATCH_SIZE', 5000))
+app.config['ROLLUP_LAG_SECONDS'] = float(os.environ.get('ROLLUP_LAG_SECONDS', 60))
+
+# Bonus quotidien : le jour change à minuit dans ce fuseau
+app.config['DAILY_BONUS_TIMEZONE'] = os.environ.get('DAILY_BONUS_TIMEZONE', 'Europe/Paris')
+
+# Instrumentation (/metrics) : en-tête Server-Timing, seuil des requêtes lentes, routes profilées ;
+# METRICS_TOKEN protège aussi /api/analytics, fermé (404) sans jeton configuré
+app.config['METRICS_SERVER_TIMING'] = os.environ.get('METRICS_SERVER_TIMING', '0') == '1'
+app.config['METRICS_SLOW_QUERY_MS'] = float(os.environ.get('METRICS_SLOW_QUERY_MS', 100))
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR')
+app.config['PROFILE_ENDPOINTS'] = [e for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e]
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
 
 # Importer db et les modèles APRÈS avoir configuré l'app
-from models import db, User, ClickerData, GameHistory, Achievement, GlobalStats, DailyBonus
+from models import db, InsufficientFunds, User, ClickerData, GameHistory, GameStats, UserStats, WeeklyProfit
+from ledger import place_bet, settle_game
+from game_state import create_store
+from cards import Hand, encode_shoe, decode_shoe
+import achievements
+import daily_bonus
+import rng
+import rollups
+from leaderboard import BOARDS, leaderboards, current_week
+from metrics import metrics
+from history_writer import history_writer
+from global_counters import global_counters
+from passwords import hasher, HashingBusy
+from stream import broker
+from http_cache import http_cache
+from upgrades import UPGRADES, MAX_BATCH
+from games import (roulette_color, roulette_multiplier, slots_multiplier,
+                   minebomb_multiplier, DEALER_STANDS_ON, blackjack_result, BLACKJACK_PAYOUTS, profit_for,
+                   draw_roulette, draw_slots, draw_minebomb, draw_blackjack)
 
 # Initialisation
 db.init_app(app)
+with app.app_context():
+    install_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
+    metrics.init_app(app, db.engine)
+
+game_states = create_store(app.config)
+history_writer.init_app(app)
+global_counters.init_app(app)
+http_cache.init_app(app)
+rng.service.init_app(app)
+daily_bonus.configure(app.config['DAILY_BONUS_TIMEZONE'])
+UserStats.cache.ttl = app.config['USER_STATS_CACHE_TTL']
+User.identity_cache.ttl = app.config['USER_IDENTITY_CACHE_TTL']
+hasher.configure(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_WORKERS'],
+                 app.config['PASSWORD_HASH_MAX_PENDING'], app.config['PASSWORD_HASH_TIMEOUT'])
+leaderboards.configure(app.config['LEADERBOARD_SIZE'], app.config['LEADERBOARD_REFRESH'],
+                       app.config['LEADERBOARD_RANK_TTL'])
+
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return User.load_principal(int(user_id))
+
+@app.errorhandler(InsufficientFunds)
+def insufficient_funds(error):
+    """Mise refusée par la garde SQL (solde modifié entre-temps par une autre requête)"""
+    return jsonify({'error': str(error)}), 400
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(error):
+    """Pool de hachage saturé : refus immédiat, le client réessaie"""
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # ============================================
 # ROUTES D'AUTHENTIFICATION
@@ -54,13 +177,10 @@ def register():
         
         user = User(username=username, email=email, money=5000)
         user.set_password(password)
+        user.clicker_data = ClickerData()
         db.session.add(user)
         db.session.commit()
         
-        clicker_data = ClickerData(user_id=user.id)
-        db.session.add(clicker_data)
-        db.session.commit()
-        
         return jsonify({'success': True, 'message': 'Compte créé avec succès!'})
     
     return render_template('register.html')
@@ -78,6 +198,8 @@ def login():
         if user and user.check_password(password):
             login_user(user)
             user.last_login = datetime.utcnow()
+            if user.password_needs_rehash():
+                user.set_password(password)
             db.session.commit()
             return jsonify({'success': True})
         
@@ -100,6 +222,8 @@ def logout():
 @login_required
 def index():
     """Page principale"""
+    current_user.settle_passive_income()
+    db.session.commit()
     return render_template('index.html', money=current_user.money)
 
 @app.route('/profile')
@@ -110,62 +234,69 @@ def profile():
 
 @app.route('/api/get_stats')
 @login_required
+@http_cache.conditional(lambda: ('global',))
 def get_stats():
     """Récupère les statistiques globales"""
     stats = get_global_stats()
+    stats['totalClicks'] = global_counters.value('total_clicks')
     return jsonify(stats)
 
 @app.route('/api/user_stats')
 @login_required
+@http_cache.conditional(lambda: ('user', current_user.id))
 def user_stats():
     """Statistiques personnelles du joueur"""
     return jsonify(current_user.get_stats())
 
+@app.route('/api/achievements')
+@login_required
+def user_achievements():
+    """Succès du jeu et ceux débloqués par le joueur"""
+    return jsonify(achievements.achievements_for(current_user.id))
+
 def get_global_stats():
-    """Calcule les stats globales depuis la DB"""
-    all_games = GameHistory.query.all()
-    
-    total_games = len(all_games)
-    total_wins = sum(1 for g in all_games if g.result == 'win')
-    total_losses = sum(1 for g in all_games if g.result == 'lose')
-    total_wagered = sum(g.bet_amount for g in all_games)
-    total_winnings = sum(g.profit for g in all_games if g.profit > 0)
-    
-    biggest_win_game = GameHistory.query.filter(GameHistory.profit > 0).order_by(GameHistory.profit.desc()).first()
-    biggest_loss_game = GameHistory.query.filter(GameHistory.profit < 0).order_by(GameHistory.profit.asc()).first()
+    """Lit les stats globales depuis les agrégats par jeu (O(1), indépendant de l'historique)"""
+    stats = {s.game_type: s for s in GameStats.query.all()}
+    empty = GameStats(games=0, wins=0, losses=0, wagered=0, won=0, biggest_win=0, biggest_loss=0)
     
     def get_game_stats(game_type):
-        games = GameHistory.query.filter_by(game_type=game_type).all()
-        wins = sum(1 for g in games if g.result == 'win')
-        wagered = sum(g.bet_amount for g in games)
-        won = sum(g.profit for g in games if g.profit > 0)
-        return {
-            'games': len(games),
-            'wins': wins,
-            'wagered': wagered,
-            'won': won
-        }
+        return stats.get(game_type, empty).to_dict()
     
+    rows = stats.values()
     return {
-        'totalGames': total_games,
-        'totalWins': total_wins,
-        'totalLosses': total_losses,
-        'biggestWin': biggest_win_game.profit if biggest_win_game else 0,
-        'biggestLoss': abs(biggest_loss_game.profit) if biggest_loss_game else 0,
-        'totalWagered': total_wagered,
-        'totalWinnings': total_winnings,
+        'totalGames': sum(s.games for s in rows),
+        'totalWins': sum(s.wins for s in rows),
+        'totalLosses': sum(s.losses for s in rows),
+        'biggestWin': max((s.biggest_win for s in rows), default=0),
+        'biggestLoss': max((s.biggest_loss for s in rows), default=0),
+        'totalWagered': sum(s.wagered for s in rows),
+        'totalWinnings': sum(s.won for s in rows),
         'blackjack': get_game_stats('blackjack'),
         'roulette': get_game_stats('roulette'),
         'minebomb': get_game_stats('minebomb'),
         'slots': get_game_stats('slots')
     }
 
+broker.init_app(app, get_global_stats)
+
+@app.route('/api/stream')
+@login_required
+def stream():
+    """Flux SSE : solde du joueur et stats globales, poussés au plus quelques fois par seconde"""
+    subscriber = broker.subscribe(current_user.id)
+    if subscriber is None:
+        # Worker plein : le client interroge /api/get_stats et retente plus tard
+        return jsonify({'error': 'Flux indisponible'}), 503, {'Retry-After': '60'}
+    return Response(broker.events(subscriber), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 # ============================================
 # MONEY CLICKER
 # ============================================
 
 @app.route('/api/clicker/get_data')
 @login_required
+@http_cache.conditional(lambda: ('user', current_user.id))
 def clicker_get_data():
     """Récupère les données du clicker"""
     clicker = current_user.clicker_data
@@ -173,139 +304,189 @@ def clicker_get_data():
     if not clicker:
         clicker = ClickerData(user_id=current_user.id)
         db.session.add(clicker)
-        db.session.commit()
     
-    return jsonify({
-        'clickPower': clicker.click_power,
-        'clickLevel': clicker.click_level,
-        'autoLevel': clicker.auto_level,
-        'factoryLevel': clicker.factory_level,
-        'bankLevel': clicker.bank_level,
-        'clickCost': clicker.click_cost,
-        'autoCost': clicker.auto_cost,
-        'factoryCost': clicker.factory_cost,
-        'bankCost': clicker.bank_cost,
-        'passiveIncome': clicker.passive_income
-    })
+    current_user.settle_passive_income()
+    db.session.commit()
+    
+    return jsonify({'money': current_user.money, **clicker.to_dict()})
+
+def apply_clicks(count):
+    """Crédite un lot de clics borné par la cadence serveur (un UPDATE par table, un commit)"""
+    clicker = current_user.clicker_data
+    now = datetime.utcnow()
+    max_cps = app.config['CLICKER_MAX_CPS']
+    
+    # Seau à jetons : la capacité se recharge à max_cps, jusqu'à une rafale de CLICKER_BURST_SECONDS
+    last_click_at = clicker.last_click_at
+    window_start = now - timedelta(seconds=app.config['CLICKER_BURST_SECONDS'])
+    base = max(last_click_at or window_start, window_start)
+    allowed = int((now - base).total_seconds() * max_cps)
+    accepted = max(0, min(count, allowed))
+    
+    current_user.settle_passive_income()
+    
+    if accepted:
+        gain = accepted * clicker.click_power
+        # UPDATE gardé par l'instant lu : deux lots simultanés ne consomment pas la même rafale
+        guard = ClickerData.last_click_at.is_(None) if last_click_at is None else ClickerData.last_click_at == last_click_at
+        updated = ClickerData.query.filter(ClickerData.id == clicker.id, guard).update({
+            ClickerData.total_clicks: ClickerData.total_clicks + accepted,
+            ClickerData.total_earned: ClickerData.total_earned + gain,
+            ClickerData.last_click_at: base + timedelta(seconds=accepted / max_cps)
+        }, synchronize_session=False)
+        if updated == 1:
+            current_user.add_money(gain)
+            global_counters.add('total_clicks', accepted)
+        else:
+            accepted = 0
+    db.session.commit()
+    
+    return accepted
 
 @app.route('/api/clicker/click', methods=['POST'])
 @login_required
 def clicker_click():
     """Gère le clic"""
-    clicker = current_user.clicker_data
-    current_user.add_money(clicker.click_power)
+    apply_clicks(1)
+    return jsonify({'money': current_user.money})
+
+@app.route('/api/clicker/clicks', methods=['POST'])
+@login_required
+def clicker_clicks():
+    """Gère un lot de clics accumulés côté client"""
+    data = request.json
+    count = int(data.get('count', 0))
     
-    clicker.total_clicks += 1
-    clicker.total_earned += clicker.click_power
-    db.session.commit()
+    if count < 0:
+        return jsonify({'error': 'Nombre de clics invalide'}), 400
     
-    return jsonify({'money': current_user.money})
+    accepted = apply_clicks(count)
+    
+    return jsonify({'money': current_user.money, 'accepted': accepted})
 
 @app.route('/api/clicker/upgrade', methods=['POST'])
 @login_required
 def clicker_upgrade():
-    """Achète une amélioration"""
+    """Achète 1, N (count) ou le maximum abordable (count='max') de niveaux, en un seul commit"""
     data = request.json
-    upgrade_type = data.get('type')
+    upgrade = UPGRADES.get(data.get('type'))
+    if upgrade is None:
+        return jsonify({'error': 'Amélioration inconnue'}), 400
+    
+    count = data.get('count', 1)
+    if count != 'max':
+        try:
+            count = int(count)
+        except (TypeError, ValueError):
+            count = 0
+        if not 1 <= count <= MAX_BATCH:
+            return jsonify({'error': f'Entre 1 et {MAX_BATCH} niveaux'}), 400
     
     clicker = current_user.clicker_data
-    
-    if upgrade_type == 'click':
-        cost = clicker.click_cost
-        if current_user.money >= cost:
-            current_user.remove_money(cost)
-            clicker.click_power += 1
-            clicker.click_level += 1
-            clicker.click_cost = int(cost * 1.5)
-        else:
-            return jsonify({'error': 'Pas assez d\'argent'}), 400
-    
-    elif upgrade_type == 'auto':
-        cost = clicker.auto_cost
-        if current_user.money >= cost:
-            current_user.remove_money(cost)
-            clicker.auto_level += 1
-            clicker.auto_cost = int(cost * 1.8)
-        else:
-            return jsonify({'error': 'Pas assez d\'argent'}), 400
-    
-    elif upgrade_type == 'factory':
-        cost = clicker.factory_cost
-        if current_user.money >= cost:
-            current_user.remove_money(cost)
-            clicker.factory_level += 1
-            clicker.factory_cost = int(cost * 2)
-        else:
-            return jsonify({'error': 'Pas assez d\'argent'}), 400
-    
-    elif upgrade_type == 'bank':
-        cost = clicker.bank_cost
-        if current_user.money >= cost:
-            current_user.remove_money(cost)
-            clicker.bank_level += 1
-            clicker.bank_cost = int(cost * 2.5)
-        else:
-            return jsonify({'error': 'Pas assez d\'argent'}), 400
-    
+    # Régler le revenu passif au taux actuel avant de changer les niveaux
+    current_user.settle_passive_income()
+    
+    level = getattr(clicker, upgrade.column)
+    if count == 'max':
+        count = upgrade.affordable(level, current_user.money)
+    cost = upgrade.cost(level, count)
+    if not count or current_user.money < cost:
+        return jsonify({'error': 'Pas assez d\'argent'}), 400
+    
+    current_user.remove_money(cost)
+    # UPDATE gardé par le niveau lu : deux achats simultanés ne paient pas deux fois le même prix
+    column = getattr(ClickerData, upgrade.column)
+    values = {
+        column: column + count,
+        ClickerData.click_power: ClickerData.click_power + count * upgrade.power
+    }
+    if not clicker.passive_income:
+        # Sans revenu jusqu'ici, accrue() n'a pas avancé l'instant : le revenu court à partir de l'achat
+        values[ClickerData.last_accrued_at] = datetime.utcnow()
+    updated = ClickerData.query.filter(ClickerData.id == clicker.id, column == level).update(values)
+    if not updated:
+        db.session.rollback()
+        return jsonify({'error': 'Achat déjà en cours, réessaie'}), 409
     db.session.commit()
     
-    return jsonify({
-        'money': current_user.money,
-        'clickPower': clicker.click_power,
-        'clickLevel': clicker.click_level,
-        'autoLevel': clicker.auto_level,
-        'factoryLevel': clicker.factory_level,
-        'bankLevel': clicker.bank_level,
-        'clickCost': clicker.click_cost,
-        'autoCost': clicker.auto_cost,
-        'factoryCost': clicker.factory_cost,
-        'bankCost': clicker.bank_cost,
-        'passiveIncome': clicker.passive_income
-    })
+    return jsonify({'money': current_user.money, 'bought': count, 'cost': cost, **clicker.to_dict()})
 
 @app.route('/api/clicker/passive', methods=['POST'])
 @login_required
 def clicker_passive():
-    """Revenu passif"""
-    clicker = current_user.clicker_data
-    passive = clicker.passive_income
-    
-    if passive > 0:
-        current_user.add_money(passive)
-        clicker.total_earned += passive
-        db.session.commit()
+    """Revenu passif : règle l'accumulé (le client n'a plus besoin d'appeler chaque seconde)"""
+    current_user.settle_passive_income()
+    db.session.commit()
     
-    return jsonify({'money': current_user.money})
+    return jsonify({
+        'money': current_user.money,
+        'passiveIncome': current_user.clicker_data.passive_income
+    })
 
 # ============================================
-# BLACKJACK
+# PARTIES EN COURS
 # ============================================
 
-def create_deck():
-    """Crée un jeu de 52 cartes"""
-    suits = ['♥', '♦', '♣', '♠']
-    values = ['A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
-    return [{'suit': suit, 'value': value} for suit in suits for value in values]
-
-def card_value(card):
-    """Retourne la valeur d'une carte"""
-    if card['value'] in ['J', 'Q', 'K']:
-        return 10
-    elif card['value'] == 'A':
-        return 11
-    else:
-        return int(card['value'])
+def start_game_state(name, state):
+    """Enregistre une nouvelle partie côté serveur ; le cookie ne garde que son identifiant"""
+    end_game_state(name)
+    game_id = f'{name}:{secrets.token_urlsafe(16)}'
+    state['user_id'] = current_user.id
+    game_states.put(game_id, state)
+    session[name] = game_id
 
-def hand_total(hand):
-    """Calcule le total d'une main"""
-    total = sum(card_value(card) for card in hand)
-    aces = sum(1 for card in hand if card['value'] == 'A')
-    
-    while total > 21 and aces:
-        total -= 10
-        aces -= 1
-    
-    return total
+def load_game_state(name):
+    """Récupère la partie en cours du joueur (None si absente, expirée ou d'un autre joueur)"""
+    game_id = session.get(name)
+    if not isinstance(game_id, str):
+        return None
+    state = game_states.get(game_id)
+    if not state or state.get('user_id') != current_user.id:
+        return None
+    if seed_revealed(state):
+        session.pop(name, None)
+        if game_states.pop(game_id):
+            forfeit_game(name, state)
+        return None
+    return state
+
+def save_game_state(name, state):
+    """Met à jour la partie en cours"""
+    game_states.put(session[name], state)
+
+def end_game_state(name):
+    """Retire la partie du store et renvoie son état : une partie ne peut être réglée qu'une fois"""
+    game_id = session.pop(name, None)
+    if not isinstance(game_id, str):
+        return None
+    state = game_states.pop(game_id)
+    if not state or state.get('user_id') != current_user.id:
+        return None
+    if seed_revealed(state):
+        forfeit_game(name, state)
+        return None
+    return state
+
+def seed_revealed(state):
+    """Vrai si la graine de la partie (mode fair) a été révélée depuis son tirage, par une autre session"""
+    proof = state.get('fair')
+    return bool(proof) and rng.is_revealed(current_user.id, proof)
+
+def forfeit_game(name, state):
+    """Règle comme perdue une partie dont le tirage est devenu public (déjà retirée du store)"""
+    settle_game(current_user, name, state['bet'], 'lose', -state['bet'], 0,
+                details=with_proof({'forfeit': 'seed_revealed'}, state.get('fair')))
+    db.session.commit()
+
+def with_proof(details, proof):
+    """Ajoute aux détails de la partie la preuve du tirage vérifiable (mode fair)"""
+    if proof:
+        details['fair'] = proof
+    return details
+
+# ============================================
+# BLACKJACK
+# ============================================
 
 @app.route('/api/blackjack/start', methods=['POST'])
 @login_required
@@ -317,34 +498,36 @@ def blackjack_start():
     if bet < 10:
         return jsonify({'error': 'Mise minimum : 10$'}), 400
     
+    current_user.settle_passive_income()
     if bet > current_user.money:
         return jsonify({'error': 'Mise trop élevée'}), 400
     
-    current_user.remove_money(bet)
+    place_bet(current_user, bet)
     
-    # Créer le deck (entre 1 et 8 decks)
-    num_decks = random.randint(1, 8)
-    deck = create_deck() * num_decks
-    random.shuffle(deck)
+    # Créer le sabot (entre 1 et 8 decks)
+    draws, proof = rng.service.for_bet(current_user.id)
+    num_decks, shoe = draw_blackjack(draws)
     
     # Distribuer les cartes
-    player_hand = [deck.pop(), deck.pop()]
-    dealer_hand = [deck.pop(), deck.pop()]
+    player = Hand((shoe.pop(), shoe.pop()))
+    dealer = Hand((shoe.pop(), shoe.pop()))
     
-    # Sauvegarder dans la session
-    session['blackjack'] = {
+    # Sauvegarder côté serveur (même commit que la mise)
+    start_game_state('blackjack', {
         'bet': bet,
-        'deck': deck,
-        'player_hand': player_hand,
-        'dealer_hand': dealer_hand,
-        'num_decks': num_decks
-    }
+        'shoe': encode_shoe(shoe),
+        'player_hand': player.cards,
+        'dealer_hand': dealer.cards,
+        'num_decks': num_decks,
+        'fair': proof
+    })
+    db.session.commit()
     
     return jsonify({
         'money': current_user.money,
-        'player_hand': player_hand,
-        'dealer_hand': dealer_hand,
-        'player_total': hand_total(player_hand),
+        'player_hand': player.to_json(),
+        'dealer_hand': dealer.to_json(),
+        'player_total': player.total,
         'num_decks': num_decks
     })
 
@@ -352,81 +535,61 @@ def blackjack_start():
 @login_required
 def blackjack_hit():
     """Tirer une carte"""
-    game = session.get('blackjack')
+    game = load_game_state('blackjack')
     if not game:
         return jsonify({'error': 'Pas de partie en cours'}), 400
     
-    card = game['deck'].pop()
-    game['player_hand'].append(card)
-    session['blackjack'] = game
+    shoe = decode_shoe(game['shoe'])
+    player = Hand(game['player_hand'])
+    player.add(shoe.pop())
     
-    player_total = hand_total(game['player_hand'])
-    busted = player_total > 21
+    game['shoe'] = encode_shoe(shoe)
+    game['player_hand'] = player.cards
+    save_game_state('blackjack', game)
+    db.session.commit()
     
     return jsonify({
-        'player_hand': game['player_hand'],
-        'player_total': player_total,
-        'busted': busted
+        'player_hand': player.to_json(),
+        'player_total': player.total,
+        'busted': player.busted
     })
 
 @app.route('/api/blackjack/stand', methods=['POST'])
 @login_required
 def blackjack_stand():
     """Se coucher et terminer la partie"""
-    game = session.get('blackjack')
+    game = end_game_state('blackjack')
     if not game:
         return jsonify({'error': 'Pas de partie en cours'}), 400
     
+    shoe = decode_shoe(game['shoe'])
+    player = Hand(game['player_hand'])
+    dealer = Hand(game['dealer_hand'])
+    
     # Dealer tire jusqu'à 17
-    while hand_total(game['dealer_hand']) < 17:
-        game['dealer_hand'].append(game['deck'].pop())
+    while dealer.total < DEALER_STANDS_ON:
+        dealer.add(shoe.pop())
     
-    player_total = hand_total(game['player_hand'])
-    dealer_total = hand_total(game['dealer_hand'])
+    player_total = player.total
+    dealer_total = dealer.total
     bet = game['bet']
     
     # Déterminer le résultat
-    if player_total > 21:
-        result = 'lose'
-        profit = -bet
-    elif dealer_total > 21 or player_total > dealer_total:
-        result = 'win'
-        profit = bet
-    elif player_total < dealer_total:
-        result = 'lose'
-        profit = -bet
-    else:
-        result = 'draw'
-        profit = 0
-    
-    # Mettre à jour l'argent
-    if result == 'win':
-        current_user.add_money(bet * 2)
-    elif result == 'draw':
-        current_user.add_money(bet)
-    
-    # Sauvegarder l'historique
-    history = GameHistory(
-        user_id=current_user.id,
-        game_type='blackjack',
-        bet_amount=bet,
-        result=result,
-        profit=profit,
-        multiplier=1.0 if result == 'win' else 0,
-        details={'player_total': player_total, 'dealer_total': dealer_total}
-    )
-    db.session.add(history)
-    db.session.commit()
+    result = blackjack_result(player_total, dealer_total)
+    profit = profit_for(bet, BLACKJACK_PAYOUTS[result])
     
-    session.pop('blackjack', None)
+    # Gain, historique et agrégats dans un seul commit
+    settle_game(current_user, 'blackjack', bet, result, profit,
+                multiplier=1.0 if result == 'win' else 0,
+                details=with_proof({'player_total': player_total, 'dealer_total': dealer_total}, game.get('fair')))
+    db.session.commit()
     
     return jsonify({
         'result': result,
         'profit': profit,
         'money': current_user.money,
-        'dealer_hand': game['dealer_hand'],
-        'dealer_total': dealer_total,
-        'stats': get_global_stats()
+        'dealer_hand': dealer.to_json(),
+        'dealer_total': dealer_total
     })
 
 # ============================================
@@ -445,48 +608,26 @@ def roulette_spin():
     if bet < 10:
         return jsonify({'error': 'Mise minimum : 10$'}), 400
     
+    current_user.settle_passive_income()
     if bet > current_user.money:
         return jsonify({'error': 'Mise trop élevée'}), 400
     
-    current_user.remove_money(bet)
+    place_bet(current_user, bet)
     
     # Générer le numéro
-    number = random.randint(0, 36)
-    
-    # Déterminer la couleur
-    red_numbers = [1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36]
-    if number == 0:
-        color = 'Green'
-    elif number in red_numbers:
-        color = 'Red'
-    else:
-        color = 'Black'
+    draws, proof = rng.service.for_bet(current_user.id)
+    number = draw_roulette(draws)
     
-    # Déterminer le résultat
-    if mode == 'color':
-        won = (choice == color)
-        multiplier = 2 if won else 0
-    else:
-        won = (int(choice) == number)
-        multiplier = 35 if won else 0
-    
-    result = 'win' if won else 'lose'
-    profit = (bet * multiplier) - bet if won else -bet
-    
-    if won:
-        current_user.add_money(bet * multiplier)
-    
-    # Sauvegarder l'historique
-    history = GameHistory(
-        user_id=current_user.id,
-        game_type='roulette',
-        bet_amount=bet,
-        result=result,
-        profit=profit,
-        multiplier=multiplier,
-        details={'number': number, 'color': color, 'choice': choice}
-    )
-    db.session.add(history)
+    # Déterminer la couleur et le résultat
+    color = roulette_color(number)
+    multiplier = roulette_multiplier(mode, choice, number)
+    
+    result = 'win' if multiplier else 'lose'
+    profit = profit_for(bet, multiplier)
+    
+    # Mise, gain, historique et agrégats dans un seul commit
+    settle_game(current_user, 'roulette', bet, result, profit, multiplier,
+                details=with_proof({'number': number, 'color': color, 'choice': choice}, proof))
     db.session.commit()
     
     return jsonify({
@@ -494,8 +635,7 @@ def roulette_spin():
         'number': number,
         'color': color,
         'profit': profit,
-        'money': current_user.money,
-        'stats': get_global_stats()
+        'money': current_user.money
     })
 
 # ============================================
@@ -513,25 +653,28 @@ def minebomb_start():
     if bet < 10:
         return jsonify({'error': 'Mise minimum : 10$'}), 400
     
+    current_user.settle_passive_income()
     if bet > current_user.money:
         return jsonify({'error': 'Mise trop élevée'}), 400
     
     if bombs < 3 or bombs > 10:
         return jsonify({'error': 'Entre 3 et 10 bombes'}), 400
     
-    current_user.remove_money(bet)
+    place_bet(current_user, bet)
     
     # Créer la grille
-    grid = ['safe'] * (25 - bombs) + ['bomb'] * bombs
-    random.shuffle(grid)
+    draws, proof = rng.service.for_bet(current_user.id)
+    grid = draw_minebomb(draws, bombs)
     
-    session['minebomb'] = {
+    start_game_state('minebomb', {
         'bet': bet,
         'bombs': bombs,
         'grid': grid,
         'revealed': [],
-        'diamonds_found': 0
-    }
+        'diamonds_found': 0,
+        'fair': proof
+    })
+    db.session.commit()
     
     return jsonify({'money': current_user.money})
 
@@ -542,7 +685,7 @@ def minebomb_reveal():
     data = request.json
     index = int(data.get('index'))
     
-    game = session.get('minebomb')
+    game = load_game_state('minebomb')
     if not game:
         return jsonify({'error': 'Pas de partie en cours'}), 400
     
@@ -550,26 +693,19 @@ def minebomb_reveal():
     game['revealed'].append(index)
     
     if cell_type == 'bomb':
-        # Perdu
-        history = GameHistory(
-            user_id=current_user.id,
-            game_type='minebomb',
-            bet_amount=game['bet'],
-            result='lose',
-            profit=-game['bet'],
-            multiplier=0,
-            details={'bombs': game['bombs'], 'diamonds': game['diamonds_found']}
-        )
-        db.session.add(history)
-        db.session.commit()
+        # Perdu (la partie est retirée du store avant d'être réglée)
+        if not end_game_state('minebomb'):
+            return jsonify({'error': 'Pas de partie en cours'}), 400
         
-        session.pop('minebomb', None)
+        settle_game(current_user, 'minebomb', game['bet'], 'lose', -game['bet'], 0,
+                    details=with_proof({'bombs': game['bombs'], 'diamonds': game['diamonds_found']},
+                                       game.get('fair')))
+        db.session.commit()
         
         return jsonify({
             'type': 'bomb',
             'money': current_user.money,
-            'grid': game['grid'],
-            'stats': get_global_stats()
+            'grid': game['grid']
         })
     
     else:
@@ -577,12 +713,12 @@ def minebomb_reveal():
         game['diamonds_found'] += 1
         
         # Calculer le multiplicateur
-        safe_cells = 25 - game['bombs']
         diamonds = game['diamonds_found']
-        multiplier = 1 + (diamonds * 0.3 * (game['bombs'] / 5))
+        multiplier = minebomb_multiplier(diamonds, game['bombs'])
         potential_win = int(game['bet'] * multiplier)
         
-        session['minebomb'] = game
+        save_game_state('minebomb', game)
+        db.session.commit()
         
         return jsonify({
             'type': 'diamond',
@@ -595,36 +731,22 @@ def minebomb_reveal():
 @login_required
 def minebomb_cashout():
     """Encaisser les gains"""
-    game = session.get('minebomb')
+    game = end_game_state('minebomb')
     if not game:
         return jsonify({'error': 'Pas de partie en cours'}), 400
     
     diamonds = game['diamonds_found']
-    multiplier = 1 + (diamonds * 0.3 * (game['bombs'] / 5))
-    winnings = int(game['bet'] * multiplier)
-    profit = winnings - game['bet']
-    
-    current_user.add_money(winnings)
-    
-    history = GameHistory(
-        user_id=current_user.id,
-        game_type='minebomb',
-        bet_amount=game['bet'],
-        result='win',
-        profit=profit,
-        multiplier=multiplier,
-        details={'bombs': game['bombs'], 'diamonds': diamonds}
-    )
-    db.session.add(history)
-    db.session.commit()
+    multiplier = minebomb_multiplier(diamonds, game['bombs'])
+    profit = profit_for(game['bet'], multiplier)
     
-    session.pop('minebomb', None)
+    settle_game(current_user, 'minebomb', game['bet'], 'win', profit, multiplier,
+                details=with_proof({'bombs': game['bombs'], 'diamonds': diamonds}, game.get('fair')))
+    db.session.commit()
     
     return jsonify({
         'profit': profit,
         'multiplier': multiplier,
-        'money': current_user.money,
-        'stats': get_global_stats()
+        'money': current_user.money
     })
 
 # ============================================
@@ -641,51 +763,23 @@ def slots_spin():
     if bet < 10:
         return jsonify({'error': 'Mise minimum : 10$'}), 400
     
+    current_user.settle_passive_income()
     if bet > current_user.money:
         return jsonify({'error': 'Mise trop élevée'}), 400
     
-    current_user.remove_money(bet)
+    place_bet(current_user, bet)
     
-    symbols = ['🎰', '🍋', '🍊', '🍇', '7️⃣', '💎']
-    reels = [random.choice(symbols) for _ in range(3)]
+    draws, proof = rng.service.for_bet(current_user.id)
+    reels = draw_slots(draws)
     
     # Déterminer le résultat
-    if reels[0] == reels[1] == reels[2]:
-        # 3 identiques
-        multipliers = {
-            '💎': 100,
-            '7️⃣': 50,
-            '🎰': 20,
-            '🍋': 15,
-            '🍊': 12,
-            '🍇': 10
-        }
-        multiplier = multipliers.get(reels[0], 10)
-        result = 'win'
-    elif reels[0] == reels[1] or reels[1] == reels[2] or reels[0] == reels[2]:
-        # 2 identiques
-        multiplier = 2
-        result = 'win'
-    else:
-        # Perdu
-        multiplier = 0
-        result = 'lose'
-    
-    profit = (bet * multiplier) - bet if result == 'win' else -bet
-    
-    if result == 'win':
-        current_user.add_money(bet * multiplier)
-    
-    history = GameHistory(
-        user_id=current_user.id,
-        game_type='slots',
-        bet_amount=bet,
-        result=result,
-        profit=profit,
-        multiplier=multiplier,
-        details={'reels': reels}
-    )
-    db.session.add(history)
+    multiplier = slots_multiplier(reels)
+    result = 'win' if multiplier else 'lose'
+    profit = profit_for(bet, multiplier)
+    
+    # Mise, gain, historique et agrégats dans un seul commit
+    settle_game(current_user, 'slots', bet, result, profit, multiplier,
+                details=with_proof({'reels': reels}, proof))
     db.session.commit()
     
     return jsonify({
@@ -693,55 +787,312 @@ def slots_spin():
         'reels': reels,
         'multiplier': multiplier,
         'profit': profit,
-        'money': current_user.money,
-        'stats': get_global_stats()
+        'money': current_user.money
     })
 
 # ============================================
 # HISTORIQUE
 # ============================================
 
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+def encode_cursor(game):
+    """Curseur opaque pointant après la partie donnée"""
+    return base64.urlsafe_b64encode(f'{game.played_at.isoformat()}|{game.id}'.encode()).decode()
+
+def decode_cursor(cursor):
+    played_at, game_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(played_at), int(game_id)
+
+def history_query(args):
+    """Historique du joueur filtré par jeu, résultat et période (plus récent d'abord)"""
+    query = GameHistory.query.filter(GameHistory.user_id == current_user.id)
+    
+    if args.get('game_type'):
+        query = query.filter(GameHistory.game_type == args['game_type'])
+    if args.get('result'):
+        query = query.filter(GameHistory.result == args['result'])
+    if args.get('since'):
+        query = query.filter(GameHistory.played_at >= datetime.fromisoformat(args['since']))
+    if args.get('until'):
+        query = query.filter(GameHistory.played_at < datetime.fromisoformat(args['until']))
+    
+    return query.order_by(GameHistory.played_at.desc(), GameHistory.id.desc())
+
 @app.route('/api/history')
 @login_required
 def get_history():
-    """Récupère l'historique des 20 dernières parties"""
-    games = GameHistory.query.filter_by(user_id=current_user.id)\
-        .order_by(GameHistory.played_at.desc())\
-        .limit(20)\
-        .all()
-    
-    return jsonify([{
-        'id': g.id,
-        'game_type': g.game_type,
-        'bet': g.bet_amount,
-        'result': g.result,
-        'profit': g.profit,
-        'multiplier': g.multiplier,
-        'date': g.played_at.isoformat()
-    } for g in games])
+    """Récupère l'historique par pages (curseur suivant dans l'en-tête X-Next-Cursor)"""
+    try:
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError("limit doit être positif")
+        limit = min(limit, HISTORY_MAX_PAGE_SIZE)
+        query = history_query(request.args)
+        
+        # Pagination par clé : reprend après (played_at, id) sans OFFSET, via l'index composite
+        if request.args.get('cursor'):
+            played_at, game_id = decode_cursor(request.args['cursor'])
+            query = query.filter(db.or_(
+                GameHistory.played_at < played_at,
+                db.and_(GameHistory.played_at == played_at, GameHistory.id < game_id)
+            ))
+    except ValueError:
+        return jsonify({'error': 'Paramètres de pagination invalides'}), 400
+    
+    games = query.limit(limit + 1).all()
+    
+    response = jsonify([g.to_dict() for g in games[:limit]])
+    if len(games) > limit:
+        response.headers['X-Next-Cursor'] = encode_cursor(games[limit - 1])
+    return response
+
+@app.route('/api/history/export')
+@login_required
+def export_history():
+    """Exporte tout l'historique filtré en NDJSON ou CSV, en flux (jamais entièrement en mémoire)"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Format inconnu (ndjson ou csv)'}), 400
+    
+    try:
+        query = history_query(request.args).yield_per(1000)
+    except ValueError:
+        return jsonify({'error': 'Filtres invalides'}), 400
+    
+    fields = ['id', 'game_type', 'bet', 'result', 'profit', 'multiplier', 'date', 'details']
+    
+    def generate_ndjson():
+        for game in query:
+            row = game.to_dict()
+            row['details'] = game.details
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fields)
+        writer.writeheader()
+        for game in query:
+            row = game.to_dict()
+            row['details'] = json.dumps(game.details, ensure_ascii=False)
+            writer.writerow(row)
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    generate = generate_ndjson if export_format == 'ndjson' else generate_csv
+    mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'text/csv'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename=historique.{export_format}'}
+    )
+
+# ============================================
+# BONUS QUOTIDIEN
+# ============================================
+
+@app.route('/api/daily_bonus', methods=['GET'])
+@login_required
+def daily_bonus_status():
+    """État du bonus du jour (réponse cachable jusqu'à minuit une fois réclamé)"""
+    status, ttl = daily_bonus.status(current_user.id)
+    response = jsonify(status)
+    response.headers['Cache-Control'] = f'private, max-age={ttl}' if status['claimed_today'] else 'private, no-cache'
+    return response
+
+@app.route('/api/daily_bonus', methods=['POST'])
+@login_required
+def claim_daily_bonus():
+    """Réclame le bonus du jour (une seule fois grâce à la contrainte unique)"""
+    current_user.settle_passive_income()
+    bonus = daily_bonus.claim(current_user)
+    if bonus is None:
+        return jsonify({'error': 'Bonus déjà réclamé aujourd\'hui'}), 400
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'amount': bonus['amount'],
+        'streak': bonus['streak'],
+        'money': current_user.money
+    })
+
+# ============================================
+# CLASSEMENTS
+# ============================================
+
+@app.route('/api/leaderboard/<board>')
+@login_required
+def get_leaderboard(board):
+    """Top du classement (richest, biggest_win, weekly_profit) et rang du joueur, servis depuis la mémoire"""
+    if board not in BOARDS:
+        return jsonify({'error': 'Classement inconnu'}), 404
+    
+    try:
+        limit = int(request.args.get('limit', 0)) or None
+    except ValueError:
+        return jsonify({'error': 'Limite invalide'}), 400
+    
+    return jsonify(leaderboards.get(board, current_user.id, limit))
+
+# ============================================
+# TIRAGE VÉRIFIABLE
+# ============================================
+
+@app.route('/api/fair')
+@login_required
+def fair_status():
+    """Graine active (hachée) et dernières graines révélées du joueur"""
+    active = rng.active_seed(current_user.id)
+    db.session.commit()
+    return jsonify({
+        'mode': rng.service.mode,
+        'active': active.to_dict(),
+        'revealed': [seed.to_dict() for seed in rng.revealed_seeds(current_user.id)]
+    })
+
+@app.route('/api/fair/rotate', methods=['POST'])
+@login_required
+def fair_rotate():
+    """Révèle la graine serveur active ; la suivante, publiée d'avance, devient active (graine client au choix)"""
+    data = request.get_json(silent=True) or {}
+    client_seed = data.get('client_seed')
+    if client_seed is not None and (not isinstance(client_seed, str) or not client_seed.isprintable()
+                                    or not 0 < len(client_seed) <= rng.CLIENT_SEED_MAX_LENGTH):
+        return jsonify({'error': 'Graine client invalide'}), 400
+    
+    # Une partie en cours tirée de la graine active serait jouée en connaissant son tirage
+    if load_game_state('blackjack') or load_game_state('minebomb'):
+        return jsonify({'error': 'Terminer la partie en cours avant la rotation'}), 409
+    
+    revealed = rng.rotate(current_user.id, client_seed, data.get('next_server_seed_hash'))
+    db.session.commit()
+    if revealed is None:
+        # Rien n'est révélé : la graine suivante (publiée) est à relire avant de choisir la graine client
+        return jsonify({
+            'error': 'Graine suivante publiée : relancer la rotation après l\'avoir notée',
+            'active': rng.active_seed(current_user.id).to_dict()
+        }), 409
+    
+    return jsonify({
+        'revealed': revealed.to_dict(),
+        'active': rng.active_seed(current_user.id).to_dict()
+    })
+
+@app.route('/api/fair/verify', methods=['POST'])
+@login_required
+def fair_verify():
+    """Rejoue le tirage d'une partie à partir de la graine serveur révélée"""
+    data = request.json
+    try:
+        return jsonify(rng.verify(str(data['server_seed']), str(data['client_seed']), int(data['nonce']),
+                                  data.get('game'), int(data.get('bombs', 5))))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Paramètres de vérification invalides'}), 400
+
+# ============================================
+# ANALYTICS
+# ============================================
+
+@app.route('/api/analytics/rollups')
+def analytics_rollups():
+    """Agrégats par heure ou par jour (jeton METRICS_TOKEN obligatoire) ; ne lit jamais game_history"""
+    metrics.check_token(required=True)
+    period = request.args.get('period', 'day')
+    if period not in rollups.PERIODS:
+        return jsonify({'error': 'Période invalide (hour ou day)'}), 400
+    try:
+        start = datetime.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = datetime.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'Date invalide (format ISO 8601)'}), 400
+    
+    return jsonify({
+        'period': period,
+        'last_id': rollups.watermark(),
+        'rollups': rollups.query(period, start, end, request.args.get('game'))
+    })
 
 # ============================================
 # INITIALISATION
 # ============================================
 
+# Le schéma et les données de référence ne sont plus créés à l'import : un worker
+# (ou un script qui importe app) démarre sans requête SQL. À lancer une fois par
+# déploiement (phase release du Procfile) : flask --app app db init && flask --app app db seed
+db_cli = AppGroup('db', help="Schéma et données de référence")
+
+def create_schema():
+    """Crée les tables manquantes, puis les colonnes et index manquants des tables existantes"""
+    db.create_all()
+    for change in upgrade_schema(db.engine, db.metadata):
+        print(f"✅ Ajouté : {change}")
+
+def seed_reference_data():
+    """Succès et agrégats initiaux (idempotent)"""
+    if achievements.seed_achievements():
+        print("✅ Achievements créés")
+    
+    if GameStats.query.count() == 0:
+        GameStats.rebuild()
+        print("✅ Statistiques par jeu initialisées")
+    
+    if UserStats.query.count() == 0 and GameHistory.query.first():
+        UserStats.rebuild()
+        print("✅ Statistiques par joueur initialisées")
+    
+    unlocked = achievements.engine.backfill()
+    if unlocked:
+        print(f"✅ {unlocked} succès rattrapés")
+
+@db_cli.command('init')
+def db_init_command():
+    """Crée les tables manquantes et met à niveau les tables existantes"""
+    create_schema()
+    print("✅ Schéma à jour")
+
+@db_cli.command('seed')
+def db_seed_command():
+    """Insère les succès et initialise les agrégats"""
+    seed_reference_data()
+
+app.cli.add_command(db_cli)
+
 def init_db():
-    """Initialise la base de données"""
+    """Schéma et données de référence (serveur de développement, banc, scripts)"""
     with app.app_context():
-        db.create_all()
-        
-        if Achievement.query.count() == 0:
-            achievements = [
-                Achievement(name='Premier pas', description='Joue ta première partie', icon='🎮', reward=100),
-                Achievement(name='Gagnant', description='Gagne 10 parties', icon='🏆', reward=500),
-                Achievement(name='Chanceux', description='Gagne avec un multiplicateur x50+', icon='🍀', reward=1000),
-                Achievement(name='Millionnaire', description='Atteins 10,000$', icon='💰', reward=2000),
-                Achievement(name='Série de victoires', description='Gagne 5 parties d\'affilée', icon='🔥', reward=1500),
-            ]
-            db.session.add_all(achievements)
-            db.session.commit()
-            print("✅ Achievements créés")
+        create_schema()
+        seed_reference_data()
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recalcule les agrégats par jeu depuis l'historique complet"""
+    for stats in GameStats.rebuild():
+        print(f"{stats.game_type}: {stats.games} parties")
+    print(f"{UserStats.rebuild()} joueurs")
+    print(f"{achievements.engine.backfill()} succès rattrapés")
+    print(f"{WeeklyProfit.rebuild(current_week())} joueurs classés cette semaine")
+
+@app.cli.command('purge-game-states')
+def purge_game_states_command():
+    """Supprime les parties abandonnées dont le TTL est dépassé"""
+    purged = game_states.purge_expired()
+    db.session.commit()
+    print(f"{purged} parties expirées supprimées")
 
-init_db()
+@app.cli.command('rollup-history')
+@click.option('--rebuild', is_flag=True, help="Vide les agrégats et repart du début de l'historique")
+def rollup_history_command(rebuild):
+    """Agrège l'historique en attente par heure et par jour"""
+    if rebuild:
+        rollups.reset()
+    count = rollups.run(app.config['ROLLUP_BATCH_SIZE'], app.config['ROLLUP_LAG_SECONDS'])
+    print(f"{count} parties agrégées (dernier id : {rollups.watermark()})")
 
 if __name__ == '__main__':
+    init_db()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,24 @@
+"""Banc de charge de l'application
+
+Crée des joueurs et un historique de parties, puis fait jouer des joueurs
+simulés en parallèle sur toutes les routes (connexion, clicker, blackjack,
+roulette, minebomb, slots, historique, statistiques, classements).
+
+Deux modes :
+    inprocess  client de test Flask dans des threads (compte aussi les requêtes SQL)
+    http       serveur déjà lancé (gunicorn), même base passée par --database ;
+               requêtes SQL lues dans Server-Timing si METRICS_SERVER_TIMING=1
+
+Usage :
+    python -m benchmark run --players 16 --duration 30 --output avant.json
+    python -m benchmark run --mode http --url http://127.0.0.1:8000 \\
+        --database sqlite:////tmp/bench.db --output apres.json
+    python -m benchmark compare avant.json apres.json --threshold 0.2
+    python -m benchmark passwords --workers 0 2 4 --concurrency 32
+    python -m benchmark polls --count 1000 --change-every 20
+    python -m benchmark rng --count 200000
+    python -m benchmark startup --workers 4
+
+Le résultat JSON donne, par route, débit, latences p50/p95/p99 (ms) et
+nombre moyen de requêtes SQL ; `compare` signale les régressions.
+"""
@@ -0,0 +1,162 @@
+"""Ligne de commande du banc : python -m benchmark run|compare|passwords|polls|rng|startup (voir benchmark/__init__.py)"""
+import argparse
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .drivers import HTTPDriver, InProcessDriver
+from .players import Player
+from .report import build_report, compare, load_report, print_report, save_report
+
+
+def load_app(database):
+    """Importe l'application sur la base demandée (DATABASE_URL est lu à l'import) et crée le schéma"""
+    os.environ['DATABASE_URL'] = database
+    from app import app, init_db
+    init_db()
+    return app
+
+
+def temporary_database():
+    """Fichier SQLite temporaire du banc, recréé vide"""
+    path = os.path.join(tempfile.gettempdir(), 'casinoeuil-benchmark.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return f'sqlite:///{path}'
+
+
+def run(args):
+    database = args.database
+    if database is None:
+        if args.mode == 'http' and not args.no_seed:
+            sys.exit("--database est requis en mode http (même base que le serveur) ou --no-seed")
+        database = temporary_database()
+    
+    app = load_app(database) if args.mode == 'inprocess' or not args.no_seed else None
+    if not args.no_seed:
+        from .seed import seed
+        started = time.perf_counter()
+        seed(app, users=max(args.users, args.players), history=args.history, seed=args.seed)
+        print(f"Base préparée en {time.perf_counter() - started:.1f} s ({database})")
+    
+    driver = InProcessDriver(app) if args.mode == 'inprocess' else HTTPDriver(args.url)
+    players = [Player(i, driver.session(), seed=args.seed + i) for i in range(args.players)]
+    
+    started = time.perf_counter()
+    deadline = None if args.rounds else started + args.duration
+    with ThreadPoolExecutor(max_workers=args.players) as pool:
+        results = list(pool.map(lambda player: player.play(deadline, args.rounds), players))
+    elapsed = time.perf_counter() - started
+    
+    report = build_report([sample for samples in results for sample in samples], elapsed, {
+        'mode': args.mode,
+        'url': args.url if args.mode == 'http' else None,
+        'database': database,
+        'players': args.players,
+        'duration': args.duration,
+        'rounds': args.rounds,
+        'users': max(args.users, args.players),
+        'history': args.history,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'started_at': datetime.utcnow().isoformat(),
+    })
+    print_report(report)
+    if args.output:
+        save_report(report, args.output)
+        print(f"Résultats enregistrés dans {args.output}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description="Banc de charge de l'application")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = commands.add_parser('run', help="Prépare la base et lance les joueurs simulés")
+    run_parser.add_argument('--mode', choices=('inprocess', 'http'), default='inprocess')
+    run_parser.add_argument('--url', default='http://127.0.0.1:8000', help="Serveur testé en mode http")
+    run_parser.add_argument('--database', default=None,
+                            help="URI de la base (défaut : fichier SQLite temporaire recréé)")
+    run_parser.add_argument('--players', type=int, default=8, help="Joueurs simultanés (un thread chacun)")
+    run_parser.add_argument('--duration', type=float, default=10, help="Durée du test en secondes")
+    run_parser.add_argument('--rounds', type=int, default=None, help="Nombre de tours par joueur (remplace --duration)")
+    run_parser.add_argument('--users', type=int, default=100, help="Joueurs créés dans la base")
+    run_parser.add_argument('--history', type=int, default=10_000, help="Parties créées dans l'historique")
+    run_parser.add_argument('--no-seed', action='store_true', help="Réutilise une base déjà préparée")
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', help="Fichier JSON des résultats")
+    
+    compare_parser = commands.add_parser('compare', help="Compare deux résultats JSON")
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    compare_parser.add_argument('--threshold', type=float, default=0.2, help="Hausse relative du p95 tolérée")
+    
+    passwords_parser = commands.add_parser('passwords', help="Mesure le pool de hachage des mots de passe")
+    passwords_parser.add_argument('--method', default='scrypt')
+    passwords_parser.add_argument('--workers', type=int, nargs='+', default=[0, 2],
+                                  help="Tailles de pool comparées (0 : dans le thread de la requête)")
+    passwords_parser.add_argument('--max-pending', type=int, default=8)
+    passwords_parser.add_argument('--concurrency', type=int, default=16)
+    passwords_parser.add_argument('--count', type=int, default=200)
+    passwords_parser.add_argument('--output', help="Fichier JSON des résultats")
+    
+    polls_parser = commands.add_parser('polls', help="Mesure les routes interrogées en boucle (ETag, compression)")
+    polls_parser.add_argument('--count', type=int, default=500, help="Lectures par route et par mode")
+    polls_parser.add_argument('--change-every', type=int, default=10,
+                              help="Une partie jouée toutes les N lectures (0 : aucune)")
+    polls_parser.add_argument('--output', help="Fichier JSON des résultats")
+    
+    rng_parser = commands.add_parser('rng', help="Compare le coût d'un tirage : random, pool CSPRNG, vérifiable")
+    rng_parser.add_argument('--count', type=int, default=100_000, help="Tirages élémentaires par mesure")
+    rng_parser.add_argument('--output', help="Fichier JSON des résultats")
+    
+    startup_parser = commands.add_parser('startup', help="Mesure l'import, le démarrage à froid et le redémarrage (HUP)")
+    startup_parser.add_argument('--workers', type=int, default=2)
+    startup_parser.add_argument('--repeats', type=int, default=5, help="Imports mesurés (médiane)")
+    startup_parser.add_argument('--output', help="Fichier JSON des résultats")
+    
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        run(args)
+    elif args.command == 'passwords':
+        from .passwords import run_passwords, print_passwords
+        results = [run_passwords(args.method, workers, args.max_pending, args.concurrency, args.count)
+                   for workers in args.workers]
+        for result in results:
+            print_passwords(result)
+        if args.output:
+            save_report({'passwords': results}, args.output)
+    elif args.command == 'polls':
+        from .polls import run_polls, print_polls
+        from .seed import seed
+        app = load_app(temporary_database())
+        seed(app, users=1, history=1000)
+        results = run_polls(app, args.count, args.change_every)
+        print_polls(results)
+        if args.output:
+            save_report({'polls': results}, args.output)
+    elif args.command == 'rng':
+        from .rng import run_rng, print_rng
+        results = run_rng(args.count)
+        print_rng(results)
+        if args.output:
+            save_report({'rng': results}, args.output)
+    elif args.command == 'startup':
+        from .startup import run_startup, print_startup
+        result = run_startup(temporary_database(), args.workers, args.repeats)
+        print_startup(result)
+        if args.output:
+            save_report({'startup': result}, args.output)
+    else:
+        regressions = compare(load_report(args.before), load_report(args.after), args.threshold)
+        for regression in regressions:
+            print(f"⚠️  {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
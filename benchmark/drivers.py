@@ -0,0 +1,121 @@
+"""Clients HTTP du banc : client de test Flask (dans le processus) ou serveur distant"""
+import http.client
+import json
+import re
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+# Nombre de requêtes SQL annoncé par le serveur (METRICS_SERVER_TIMING=1)
+SERVER_TIMING_STATEMENTS = re.compile(r'db;dur=[\d.]+;desc="(\d+) statements"')
+
+
+class Sample:
+    """Mesure d'une requête"""
+    __slots__ = ('label', 'status', 'latency', 'statements')
+    
+    def __init__(self, label, status, latency, statements=None):
+        self.label = label
+        self.status = status
+        self.latency = latency
+        self.statements = statements
+
+
+class StatementCounter:
+    """Compte les requêtes SQL exécutées par le thread courant (événement du moteur)"""
+    
+    def __init__(self, engine):
+        from sqlalchemy import event
+        
+        self._local = threading.local()
+        event.listen(engine, 'before_cursor_execute', self._count)
+    
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+    
+    def reset(self):
+        self._local.count = 0
+    
+    def value(self):
+        return getattr(self._local, 'count', 0)
+
+
+class InProcessDriver:
+    """Un client de test Flask par joueur ; les requêtes SQL sont comptées"""
+    
+    def __init__(self, app):
+        self.app = app
+        with app.app_context():
+            from models import db
+            self.counter = StatementCounter(db.engine)
+    
+    def session(self):
+        return _TestClientSession(self.app.test_client(), self.counter)
+
+
+class _TestClientSession:
+    def __init__(self, client, counter):
+        self.client = client
+        self.counter = counter
+    
+    def request(self, method, path, body=None, label=None):
+        self.counter.reset()
+        start = time.perf_counter()
+        response = self.client.open(path, method=method, json=body)
+        latency = time.perf_counter() - start
+        data = response.get_json(silent=True)
+        return Sample(label or f'{method} {path}', response.status_code, latency, self.counter.value()), data
+
+
+class HTTPDriver:
+    """Serveur déjà lancé (gunicorn...) : une connexion persistante par joueur"""
+    
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+    
+    def session(self):
+        return _HTTPSession(self.host, self.port)
+
+
+class _HTTPSession:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.connection = None
+        self.cookies = SimpleCookie()
+    
+    def request(self, method, path, body=None, label=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{key}={morsel.value}' for key, morsel in self.cookies.items())
+        payload = json.dumps(body) if body is not None else None
+        
+        start = time.perf_counter()
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            try:
+                self.connection.request(method, path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                raw = response.read()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # Connexion fermée par le serveur (keep-alive expiré) : une seule reconnexion
+                self.connection.close()
+                self.connection = None
+                if attempt:
+                    raise
+        latency = time.perf_counter() - start
+        
+        for header in response.headers.get_all('Set-Cookie') or ():
+            self.cookies.load(header)
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        match = SERVER_TIMING_STATEMENTS.search(', '.join(response.headers.get_all('Server-Timing') or ()))
+        statements = int(match.group(1)) if match else None
+        return Sample(label or f'{method} {path}', response.status, latency, statements), data
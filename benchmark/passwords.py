@@ -0,0 +1,50 @@
+"""Banc du pool de hachage : débit, latences et rejets sous une vague de connexions"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passwords import PasswordHasher, HashingBusy
+
+from .drivers import Sample
+from .report import summarize
+
+
+def run_passwords(method='scrypt', workers=2, max_pending=8, concurrency=16, count=200):
+    """Vérifie `count` mots de passe depuis `concurrency` threads (comme autant de requêtes /login)"""
+    hasher = PasswordHasher(method, workers, max_pending)
+    password_hash = PasswordHasher(method).hash('benchmark')
+    hasher.verify(password_hash, 'benchmark')  # Démarrage du pool hors mesure
+    
+    def attempt(_):
+        start = time.perf_counter()
+        try:
+            hasher.verify(password_hash, 'benchmark')
+            status = 200
+        except HashingBusy:
+            status = 503
+        return Sample('verify', status, time.perf_counter() - start)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(attempt, range(count)))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+    
+    accepted = [sample for sample in samples if sample.status == 200]
+    rejected = [sample for sample in samples if sample.status == 503]
+    return {
+        'method': method,
+        'workers': workers,
+        'max_pending': max_pending,
+        'concurrency': concurrency,
+        'accepted': summarize(accepted, elapsed),
+        'rejected': summarize(rejected, elapsed),
+    }
+
+
+def print_passwords(result):
+    accepted, rejected = result['accepted'], result['rejected']
+    print(f"{result['method']} : {result['workers']} processus, {result['max_pending']} en attente max, "
+          f"{result['concurrency']} connexions simultanées")
+    print(f"  acceptées {accepted['requests']:>5}  {accepted['throughput']:.1f}/s  "
+          f"p50 {accepted['p50_ms'] or 0:.1f} ms  p95 {accepted['p95_ms'] or 0:.1f} ms  p99 {accepted['p99_ms'] or 0:.1f} ms")
+    print(f"  rejetées  {rejected['requests']:>5}  p99 {rejected['p99_ms'] or 0:.2f} ms")
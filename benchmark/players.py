@@ -0,0 +1,79 @@
+"""Joueur simulé : un tour = une visite de chaque route de l'application"""
+import random
+import time
+
+from .seed import PASSWORD, USERNAME
+
+BET = 10
+
+
+class Player:
+    """Enchaîne les tours de jeu d'un compte du banc et garde les mesures"""
+    
+    def __init__(self, index, session, seed=None):
+        self.username = USERNAME.format(index)
+        self.session = session
+        self.rng = random.Random(seed)
+        self.samples = []
+    
+    def call(self, method, path, body=None):
+        sample, data = self.session.request(method, path, body)
+        self.samples.append(sample)
+        return data or {}
+    
+    def login(self):
+        self.call('POST', '/login', {'username': self.username, 'password': PASSWORD})
+    
+    def clicker(self):
+        self.call('GET', '/api/clicker/get_data')
+        for _ in range(5):
+            self.call('POST', '/api/clicker/click')
+        self.call('POST', '/api/clicker/clicks', {'count': 10})
+        self.call('POST', '/api/clicker/passive')
+    
+    def blackjack(self):
+        data = self.call('POST', '/api/blackjack/start', {'bet': BET})
+        total = data.get('player_total', 21)
+        while total < 17:
+            data = self.call('POST', '/api/blackjack/hit')
+            if data.get('busted'):
+                break
+            total = data.get('player_total', 21)
+        self.call('POST', '/api/blackjack/stand')
+    
+    def roulette(self):
+        if self.rng.random() < 0.5:
+            self.call('POST', '/api/roulette/spin',
+                      {'bet': BET, 'mode': 'color', 'choice': self.rng.choice(('Red', 'Black'))})
+        else:
+            self.call('POST', '/api/roulette/spin',
+                      {'bet': BET, 'mode': 'number', 'choice': self.rng.randrange(37)})
+    
+    def minebomb(self):
+        self.call('POST', '/api/minebomb/start', {'bet': BET, 'bombs': 5})
+        for index in self.rng.sample(range(25), self.rng.randint(1, 3)):
+            if self.call('POST', '/api/minebomb/reveal', {'index': index}).get('type') == 'bomb':
+                return
+        self.call('POST', '/api/minebomb/cashout')
+    
+    def slots(self):
+        self.call('POST', '/api/slots/spin', {'bet': BET})
+    
+    def browse(self):
+        self.call('GET', '/api/history')
+        self.call('GET', '/api/get_stats')
+        self.call('GET', '/api/user_stats')
+        self.call('GET', '/api/achievements')
+        self.call('GET', '/api/leaderboard/richest')
+    
+    ROUND = ('clicker', 'blackjack', 'roulette', 'minebomb', 'slots', 'browse')
+    
+    def play(self, deadline=None, rounds=None):
+        """Joue jusqu'à l'échéance (time.perf_counter) ou pendant `rounds` tours"""
+        self.login()
+        played = 0
+        while (rounds is None or played < rounds) and (deadline is None or time.perf_counter() < deadline):
+            for step in self.ROUND:
+                getattr(self, step)()
+            played += 1
+        return self.samples
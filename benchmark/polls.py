@@ -0,0 +1,63 @@
+"""Banc des routes interrogées en boucle : octets et CPU par requête, avec ou sans GET conditionnel"""
+import time
+
+from .drivers import Sample
+from .report import summarize
+from .seed import PASSWORD, USERNAME
+
+POLLED = ('/api/get_stats', '/api/clicker/get_data', '/api/user_stats')
+
+# Navigateur qui garde l'ETag et accepte la compression, ou client qui relit tout à chaque fois
+MODES = {
+    'plain': False,
+    'conditional': True,
+}
+
+
+def run_polls(app, count=500, change_every=10):
+    """Relit chaque route `count` fois par mode ; une partie est jouée toutes les `change_every` lectures"""
+    results = []
+    for mode, conditional in MODES.items():
+        client = app.test_client()
+        client.post('/login', json={'username': USERNAME.format(0), 'password': PASSWORD})
+        for path in POLLED:
+            etag = None
+            samples, sizes, cpu = [], 0, 0.0
+            for index in range(count):
+                if change_every and index % change_every == change_every - 1:
+                    client.post('/api/slots/spin', json={'bet': 10})
+                headers = {}
+                if conditional:
+                    headers['Accept-Encoding'] = 'br, gzip'
+                    if etag:
+                        headers['If-None-Match'] = etag
+                
+                cpu_start = time.thread_time()
+                start = time.perf_counter()
+                response = client.get(path, headers=headers)
+                body = response.get_data()
+                samples.append(Sample(path, response.status_code, time.perf_counter() - start))
+                cpu += time.thread_time() - cpu_start
+                sizes += len(body)
+                etag = response.headers.get('ETag', etag)
+            
+            summary = summarize(samples, None)
+            results.append({
+                'mode': mode,
+                'path': path,
+                'requests': count,
+                'not_modified': sum(1 for sample in samples if sample.status == 304),
+                'bytes_per_request': sizes / count,
+                'cpu_ms_per_request': cpu * 1000 / count,
+                'p50_ms': summary['p50_ms'],
+                'p95_ms': summary['p95_ms'],
+            })
+    return results
+
+
+def print_polls(results):
+    print(f"{'route':<26} {'mode':<12} {'304':>6} {'octets':>8} {'cpu ms':>8} {'p50':>7} {'p95':>7}")
+    for result in results:
+        print(f"{result['path']:<26} {result['mode']:<12} {result['not_modified']:>6} "
+              f"{result['bytes_per_request']:>8.0f} {result['cpu_ms_per_request']:>8.3f} "
+              f"{result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f}")
@@ -0,0 +1,83 @@
+"""Agrégation des mesures, export JSON et comparaison de deux résultats"""
+import json
+import math
+from collections import defaultdict
+
+
+def percentile(sorted_values, fraction):
+    """Percentile au rang le plus proche sur une liste triée"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(fraction * len(sorted_values)) - 1, 0)]
+
+
+def summarize(samples, elapsed):
+    """Statistiques d'un groupe de mesures (latences en millisecondes)"""
+    latencies = sorted(sample.latency * 1000 for sample in samples)
+    statements = [sample.statements for sample in samples if sample.statements is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample.status >= 400),
+        'throughput': len(samples) / elapsed if elapsed else 0,
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': latencies[-1] if latencies else None,
+        'statements': sum(statements) / len(statements) if statements else None,
+    }
+
+
+def build_report(samples, elapsed, meta):
+    by_label = defaultdict(list)
+    for sample in samples:
+        by_label[sample.label].append(sample)
+    return {
+        'meta': meta,
+        'elapsed_s': elapsed,
+        'total': summarize(samples, elapsed),
+        'routes': {label: summarize(group, elapsed) for label, group in sorted(by_label.items())},
+    }
+
+
+def _fmt(value, spec='.2f'):
+    return '-' if value is None else format(value, spec)
+
+
+def print_report(report):
+    total = report['total']
+    print(f"{total['requests']} requêtes en {report['elapsed_s']:.1f} s "
+          f"({total['throughput']:.0f} req/s, {total['errors']} erreurs)")
+    print(f"{'route':<36} {'req':>7} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'sql':>6}")
+    for label, stats in report['routes'].items():
+        print(f"{label:<36} {stats['requests']:>7} {stats['errors']:>5} {_fmt(stats['p50_ms']):>8} "
+              f"{_fmt(stats['p95_ms']):>8} {_fmt(stats['p99_ms']):>8} {_fmt(stats['statements'], '.1f'):>6}")
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(before, after, threshold=0.2):
+    """Liste des régressions : p95 plus lent de `threshold` (relatif) ou requêtes SQL en plus"""
+    regressions = []
+    print(f"{'route':<36} {'p95 avant':>10} {'p95 après':>10} {'écart':>8} {'sql avant':>10} {'sql après':>10}")
+    for label, new in after['routes'].items():
+        old = before['routes'].get(label)
+        if old is None:
+            continue
+        change = (new['p95_ms'] / old['p95_ms'] - 1) if old['p95_ms'] else 0
+        print(f"{label:<36} {_fmt(old['p95_ms']):>10} {_fmt(new['p95_ms']):>10} {change:>+8.0%} "
+              f"{_fmt(old['statements'], '.1f'):>10} {_fmt(new['statements'], '.1f'):>10}")
+        if change > threshold:
+            regressions.append(f"{label} : p95 {old['p95_ms']:.2f} → {new['p95_ms']:.2f} ms")
+        if old['statements'] is not None and new['statements'] is not None \
+                and new['statements'] > old['statements'] + 0.5:
+            regressions.append(f"{label} : {old['statements']:.1f} → {new['statements']:.1f} requêtes SQL")
+    return regressions
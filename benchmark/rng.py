@@ -0,0 +1,55 @@
+"""Banc des générateurs : coût d'un tirage avec random, le pool CSPRNG et le tirage vérifiable"""
+import itertools
+import random
+import timeit
+from functools import partial
+
+from cards import DECK
+from games import SLOT_SYMBOLS
+
+from rng import EntropyPool, FairRandom
+
+SERVER_SEED = '0' * 64
+
+
+GRID = ['safe'] * 20 + ['bomb'] * 5
+SHOE = DECK * 8
+
+# Tirages des jeux : (nom, fonction du générateur, tirages élémentaires par appel)
+CASES = (
+    ('randint(0, 36)', lambda rng: rng.randint(0, 36), 1),
+    ('choice(symboles)', lambda rng: rng.choice(SLOT_SYMBOLS), 1),
+    ('shuffle(25 cases)', lambda rng: rng.shuffle(GRID), len(GRID) - 1),
+    ('shuffle(8 jeux)', lambda rng: rng.shuffle(SHOE), len(SHOE) - 1),
+)
+
+
+def run_rng(count=100_000):
+    """Coût en nanosecondes par tirage élémentaire, pour chaque générateur"""
+    pool = EntropyPool()
+    nonces = itertools.count()
+    callers = {
+        'random': lambda draw: partial(draw, random),
+        'pool': lambda draw: partial(draw, pool),
+        # Un FairRandom neuf par partie (nonce suivant), comme en production : sa création est comptée
+        'fair': lambda draw: lambda: draw(FairRandom(SERVER_SEED, 'benchmark', next(nonces))),
+    }
+    results = []
+    for name, caller in callers.items():
+        for label, draw, per_call in CASES:
+            calls = max(count // per_call, 10)
+            elapsed = min(timeit.repeat(caller(draw), number=calls, repeat=3))
+            results.append({
+                'generator': name,
+                'draw': label,
+                'ns_per_call': elapsed / calls * 1e9,
+                'ns_per_draw': elapsed / (calls * per_call) * 1e9,
+            })
+    return results
+
+
+def print_rng(results):
+    print(f"{'tirage':<20} {'générateur':<10} {'ns/appel':>10} {'ns/tirage':>10}")
+    for result in results:
+        print(f"{result['draw']:<20} {result['generator']:<10} "
+              f"{result['ns_per_call']:>10.0f} {result['ns_per_draw']:>10.0f}")
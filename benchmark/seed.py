@@ -0,0 +1,64 @@
+"""Création des joueurs et de l'historique du banc (insertion par lots)"""
+import random
+from datetime import datetime, timedelta
+
+from games import profit_for
+
+PASSWORD = 'benchmark'
+USERNAME = 'bench_{}'
+CHUNK_SIZE = 5000
+
+
+def seed(app, users=100, history=100_000, money=10_000_000, days=30, seed=0):
+    """Crée `users` joueurs (si absents) et `history` parties réparties entre eux ; renvoie les identifiants"""
+    from models import (db, User, ClickerData, GameHistory, GameStats, UserStats, WeeklyProfit,
+                        GAME_TYPES)
+    from leaderboard import current_week
+    
+    rng = random.Random(seed)
+    
+    with app.app_context():
+        existing = {name for (name,) in db.session.query(User.username)
+                    .filter(User.username.like(USERNAME.format('%')))}
+        
+        # Un seul hachage du mot de passe, partagé par tous les joueurs du banc
+        template = User(username='', email='')
+        template.set_password(PASSWORD)
+        
+        new_users = [User(username=USERNAME.format(i), email=f'{USERNAME.format(i)}@bench.local',
+                          password_hash=template.password_hash, money=money)
+                     for i in range(users) if USERNAME.format(i) not in existing]
+        for user in new_users:
+            user.clicker_data = ClickerData()
+        db.session.add_all(new_users)
+        db.session.commit()
+        
+        user_ids = [user_id for (user_id,) in db.session.query(User.id)
+                    .filter(User.username.like(USERNAME.format('%'))).order_by(User.id)]
+        
+        now = datetime.utcnow()
+        for start in range(0, history, CHUNK_SIZE):
+            rows = []
+            for _ in range(min(CHUNK_SIZE, history - start)):
+                bet = rng.choice((10, 50, 100, 500))
+                result = rng.choice(('win', 'lose', 'lose', 'draw'))
+                multiplier = rng.choice((1.0, 2.0, 2.0, 10.0, 35.0)) if result == 'win' else 0
+                rows.append({
+                    'user_id': rng.choice(user_ids),
+                    'game_type': rng.choice(GAME_TYPES),
+                    'bet_amount': bet,
+                    'result': result,
+                    'profit': profit_for(bet, multiplier) if result == 'win' else (0 if result == 'draw' else -bet),
+                    'multiplier': multiplier,
+                    'details': {},
+                    'played_at': now - timedelta(seconds=rng.uniform(0, days * 86400)),
+                })
+            db.session.execute(db.insert(GameHistory), rows)
+            db.session.commit()
+        
+        # Agrégats recalculés une fois, comme après `flask rebuild-stats`
+        GameStats.rebuild()
+        UserStats.rebuild()
+        WeeklyProfit.rebuild(current_week())
+        
+        return user_ids
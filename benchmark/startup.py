@@ -0,0 +1,160 @@
+"""Banc du démarrage : import de l'application, démarrage à froid et redémarrage progressif sous gunicorn"""
+import http.client
+import os
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BOOTING = re.compile(r'Booting worker with pid: (\d+)')
+EXITING = re.compile(r'Worker exiting \(pid: (\d+)\)')
+
+IMPORT_SCRIPT = 'import time; start = time.perf_counter(); import app; print(time.perf_counter() - start)'
+
+
+def _env(database, **extra):
+    return dict(os.environ, DATABASE_URL=database, PYTHONPATH=ROOT, **extra)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def measure_cli(database):
+    """Durée de flask db init et flask db seed (phase release)"""
+    timings = {}
+    for command in ('init', 'seed'):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', command], cwd=ROOT,
+                       env=_env(database), check=True, capture_output=True)
+        timings[f'db_{command}_s'] = time.perf_counter() - start
+    return timings
+
+
+def measure_import(database, repeats=5):
+    """Import de app dans un interpréteur neuf (ce que paie chaque worker sans --preload)"""
+    imports, processes = [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], cwd=ROOT, env=_env(database),
+                                check=True, capture_output=True, text=True)
+        processes.append(time.perf_counter() - start)
+        imports.append(float(result.stdout.strip().splitlines()[-1]))
+    return {'import_s': statistics.median(imports), 'process_s': statistics.median(processes)}
+
+
+class _Server:
+    """gunicorn lancé avec gunicorn.conf.py ; les démarrages de workers sont lus dans son journal"""
+    
+    def __init__(self, database, workers, preload):
+        self.port = _free_port()
+        self.boots = {}
+        self.exits = set()
+        self._lock = threading.Lock()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', 'app:app', '--bind', f'127.0.0.1:{self.port}',
+             '--workers', str(workers)],
+            cwd=ROOT, env=_env(database, GUNICORN_PRELOAD='1' if preload else '0'),
+            stderr=subprocess.PIPE, text=True)
+        threading.Thread(target=self._read_log, daemon=True).start()
+    
+    def _read_log(self):
+        for line in self.process.stderr:
+            booting, exiting = BOOTING.search(line), EXITING.search(line)
+            with self._lock:
+                if booting:
+                    self.boots[int(booting.group(1))] = time.perf_counter()
+                if exiting:
+                    self.exits.add(int(exiting.group(1)))
+    
+    def workers(self):
+        """pid des workers démarrés et pas encore arrêtés"""
+        with self._lock:
+            return set(self.boots) - self.exits
+    
+    def get(self, path='/login'):
+        """Statut et latence d'une requête (None si le serveur ne répond pas)"""
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        start = time.perf_counter()
+        try:
+            connection.request('GET', path)
+            status = connection.getresponse().status
+        except OSError:
+            status = None
+        finally:
+            connection.close()
+        return status, time.perf_counter() - start
+    
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def measure_gunicorn(database, workers=2, preload=True, timeout=60):
+    """Démarrage à froid (jusqu'à la première réponse) puis redémarrage progressif (HUP)"""
+    started = time.perf_counter()
+    server = _Server(database, workers, preload)
+    try:
+        while server.get()[0] != 200:
+            if time.perf_counter() - started > timeout or server.process.poll() is not None:
+                raise RuntimeError("gunicorn n'a pas démarré")
+            time.sleep(0.01)
+        cold_start = time.perf_counter() - started
+        while len(server.workers()) < workers and time.perf_counter() - started < timeout:
+            time.sleep(0.01)
+        all_workers = time.perf_counter() - started
+        
+        # HUP : nouveaux workers, arrêt des anciens ; terminé quand tous les anciens sont partis
+        # et qu'un nouveau a répondu. Le trafic continue pendant ce temps.
+        old_workers = server.workers()
+        restarted = time.perf_counter()
+        server.process.send_signal(signal.SIGHUP)
+        errors, latencies = 0, []
+        while time.perf_counter() - restarted < timeout:
+            replaced = not old_workers & server.workers()
+            status, latency = server.get()
+            latencies.append(latency)
+            errors += status != 200
+            if replaced and status == 200:
+                break
+        restart = time.perf_counter() - restarted
+    finally:
+        server.stop()
+    
+    return {
+        'preload': preload,
+        'workers': workers,
+        'cold_start_s': cold_start,
+        'all_workers_s': all_workers,
+        'restart_s': restart,
+        'restart_requests': len(latencies),
+        'restart_errors': errors,
+        'restart_max_ms': max(latencies) * 1000 if latencies else None,
+    }
+
+
+def run_startup(database, workers=2, repeats=5):
+    result = measure_cli(database)
+    result.update(measure_import(database, repeats))
+    result['gunicorn'] = [measure_gunicorn(database, workers, preload) for preload in (False, True)]
+    return result
+
+
+def print_startup(result):
+    print(f"flask db init {result['db_init_s'] * 1000:.0f} ms, flask db seed {result['db_seed_s'] * 1000:.0f} ms")
+    print(f"import app {result['import_s'] * 1000:.0f} ms (processus complet {result['process_s'] * 1000:.0f} ms)")
+    print(f"{'preload':<8} {'workers':>7} {'1re rép.':>9} {'tous':>8} {'HUP':>8} {'req':>5} {'err':>4} {'max ms':>8}")
+    for run in result['gunicorn']:
+        print(f"{'oui' if run['preload'] else 'non':<8} {run['workers']:>7} {run['cold_start_s']:>8.2f}s "
+              f"{run['all_workers_s']:>7.2f}s {run['restart_s']:>7.2f}s {run['restart_requests']:>5} "
+              f"{run['restart_errors']:>4} {run['restart_max_ms'] or 0:>8.1f}")
@@ -0,0 +1,68 @@
+"""Cartes compactes du blackjack : une carte = un entier 0..51 (couleur * 13 + rang)
+
+Le sabot est un array('B') (un octet par carte) et les valeurs sont lues
+dans des tables précalculées : plus de dicts ni de int() dans la boucle de
+jeu. La forme JSON {'suit', 'value'} n'est produite qu'à la frontière de l'API.
+"""
+import random
+from array import array
+
+SUITS = ('♥', '♦', '♣', '♠')
+RANKS = ('A', '2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+
+# Tables indexées par carte
+CARD_VALUES = bytes(11 if rank == 0 else min(rank + 1, 10) for _ in SUITS for rank in range(13))
+CARD_JSON = tuple({'suit': suit, 'value': value} for suit in SUITS for value in RANKS)
+
+DECK = array('B', range(52))
+
+
+def new_shoe(num_decks, rng=random):
+    """Sabot mélangé de num_decks jeux de 52 cartes"""
+    shoe = DECK * num_decks
+    rng.shuffle(shoe)
+    return shoe
+
+
+def encode_shoe(shoe):
+    """Sabot -> chaîne compacte pour le store de parties (2 caractères par carte)"""
+    return shoe.tobytes().hex()
+
+
+def decode_shoe(data):
+    return array('B', bytes.fromhex(data))
+
+
+def cards_to_json(cards):
+    return [CARD_JSON[card] for card in cards]
+
+
+class Hand:
+    """Main de blackjack : total et as « souples » tenus à jour en O(1) par carte"""
+    __slots__ = ('cards', 'total', 'soft_aces')
+    
+    def __init__(self, cards=()):
+        self.cards = []
+        self.total = 0
+        self.soft_aces = 0
+        for card in cards:
+            self.add(card)
+    
+    def add(self, card):
+        value = CARD_VALUES[card]
+        self.cards.append(card)
+        self.total += value
+        if value == 11:
+            self.soft_aces += 1
+        # Au plus deux itérations : un as compté 11 repasse à 1
+        while self.total > 21 and self.soft_aces:
+            self.total -= 10
+            self.soft_aces -= 1
+        return self.total
+    
+    @property
+    def busted(self):
+        return self.total > 21
+    
+    def to_json(self):
+        return cards_to_json(self.cards)
@@ -0,0 +1,83 @@
+"""Bonus quotidien : un par jour local, série prolongée depuis la veille
+
+La série se lit sur la seule ligne de la veille (index unique user_id,
+claimed_date) ; la réclamation est un INSERT qui échoue en silence sur ce
+même index : deux réclamations simultanées ne peuvent pas passer, sans
+lecture préalable. Une fois le bonus réclamé, le statut ne change plus avant
+minuit (heure locale) : il est mis en cache jusque-là. Le statut « non
+réclamé » n'est jamais mis en cache, une réclamation traitée par un autre
+worker le rendrait faux.
+"""
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from cache import TTLCache
+from ledger import on_commit
+from models import db, DailyBonus, insert_ignore
+
+BASE_AMOUNT = 500
+STREAK_STEP = 250
+MAX_STREAK = 7  # La récompense plafonne au 7e jour consécutif
+
+timezone = ZoneInfo('Europe/Paris')
+cache = TTLCache(ttl=86400)
+
+
+def configure(tz_name):
+    global timezone
+    timezone = ZoneInfo(tz_name)
+    cache.clear()
+
+
+def amount_for(streak):
+    return BASE_AMOUNT + STREAK_STEP * (min(streak, MAX_STREAK) - 1)
+
+
+def local_now():
+    return datetime.now(timezone)
+
+
+def next_midnight(now):
+    return datetime.combine(now.date() + timedelta(days=1), time(0), tzinfo=timezone)
+
+
+def _streak_on(user_id, day):
+    """Série du jour donné (0 si pas de bonus ce jour-là) : une lecture sur l'index unique"""
+    return db.session.query(DailyBonus.streak_days) \
+        .filter(DailyBonus.user_id == user_id, DailyBonus.claimed_date == day).scalar() or 0
+
+
+def status(user_id):
+    """État du bonus du jour ; renvoie (statut, secondes de validité)"""
+    now = local_now()
+    ttl = max(int((next_midnight(now) - now).total_seconds()), 1)
+    key = (user_id, now.date())
+    
+    cached = cache.get(key)
+    if cached is None:
+        today = _streak_on(user_id, now.date())
+        streak = today or _streak_on(user_id, now.date() - timedelta(days=1))
+        cached = {
+            'claimed_today': bool(today),
+            'streak': streak,
+            'next_amount': amount_for(streak + 1),
+            'next_claim_at': next_midnight(now).isoformat() if today else None,
+        }
+        if today:
+            cache.set(key, cached, ttl=ttl)
+    return cached, ttl
+
+
+def claim(user):
+    """Verse le bonus du jour (sans commit) ; None si déjà réclamé aujourd'hui"""
+    today = local_now().date()
+    streak = _streak_on(user.id, today - timedelta(days=1)) + 1
+    amount = amount_for(streak)
+    
+    if not insert_ignore(DailyBonus.__table__, user_id=user.id, claimed_date=today,
+                         bonus_amount=amount, streak_days=streak):
+        return None
+    user.add_money(amount)
+    key = (user.id, today)
+    on_commit(lambda: cache.invalidate(key))
+    return {'amount': amount, 'streak': streak}
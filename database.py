@@ -0,0 +1,124 @@
+"""Configuration de la base : URI, options du moteur (pool) et réglages SQLite
+
+Tout se règle par variables d'environnement pour pouvoir passer de SQLite
+à une base serveur (PostgreSQL...) sans modifier le code :
+
+    DATABASE_URL            URI SQLAlchemy (défaut : sqlite:///casinoeuil.db)
+    DB_POOL_SIZE            connexions gardées ouvertes par worker
+    DB_MAX_OVERFLOW         connexions supplémentaires autorisées en pic
+    DB_POOL_TIMEOUT         attente max d'une connexion libre (secondes)
+    DB_POOL_RECYCLE         durée de vie max d'une connexion (secondes)
+    DB_POOL_PRE_PING        vérifie la connexion avant usage (1/0)
+    SQLITE_TUNING           WAL + synchronous=NORMAL sur SQLite (1/0, défaut 1)
+    SQLITE_BUSY_TIMEOUT_MS  attente d'un verrou d'écriture (défaut 5000)
+    SQLITE_MMAP_SIZE        taille du mmap en octets (défaut 256 Mo)
+"""
+import os
+
+from sqlalchemy import event, inspect, text
+
+DEFAULT_DATABASE_URI = 'sqlite:///casinoeuil.db'
+
+
+def _env_int(name):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else None
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def database_uri():
+    """URI de la base depuis DATABASE_URL (corrige le préfixe postgres:// des hébergeurs)"""
+    uri = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+    if uri.startswith('postgres://'):
+        uri = 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def engine_options(uri):
+    """Options create_engine : seules les valeurs fournies sont transmises"""
+    options = {'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', not uri.startswith('sqlite'))}
+    
+    for option, name in (('pool_size', 'DB_POOL_SIZE'),
+                         ('max_overflow', 'DB_MAX_OVERFLOW'),
+                         ('pool_timeout', 'DB_POOL_TIMEOUT'),
+                         ('pool_recycle', 'DB_POOL_RECYCLE')):
+        value = _env_int(name)
+        if value is not None:
+            options[option] = value
+    
+    if uri.startswith('sqlite'):
+        # Délai du pilote sqlite3 quand la base est verrouillée par un autre worker
+        busy_timeout = _env_int('SQLITE_BUSY_TIMEOUT_MS') or 5000
+        options['connect_args'] = {'timeout': busy_timeout / 1000}
+    
+    return options
+
+
+def sqlite_pragmas():
+    """PRAGMA appliqués à chaque connexion SQLite (vide si SQLITE_TUNING=0)"""
+    if not _env_bool('SQLITE_TUNING', True):
+        return {}
+    return {
+        'journal_mode': 'WAL',         # Les lecteurs ne bloquent plus l'écrivain (et inversement)
+        'synchronous': 'NORMAL',       # Un fsync par checkpoint WAL plutôt que par commit
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS') or 5000,
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE') or 256 * 1024 * 1024,
+    }
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Exécute les PRAGMA sur chaque nouvelle connexion du moteur (SQLite uniquement)"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f'PRAGMA {key}={value}')
+        cursor.close()
+
+
+def upgrade_schema(engine, metadata):
+    """Ajoute aux tables existantes les colonnes et index déclarés depuis leur création (idempotent)
+
+    create_all() ne crée que les tables absentes : une base plus ancienne que
+    le modèle n'a ni les nouvelles colonnes ni les nouveaux index. Une colonne
+    ajoutée à une table existante doit accepter NULL (les lignes présentes
+    n'ont pas de valeur). Renvoie la liste des changements appliqués.
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    changes = []
+    
+    with engine.begin() as connection:
+        for table in metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"Colonne {table.name}.{column.name} NOT NULL : migration manuelle requise")
+                connection.execute(text(
+                    f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} '
+                    f'{column.type.compile(engine.dialect)}'
+                ))
+                changes.append(f'{table.name}.{column.name}')
+            
+            indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+                    changes.append(index.name)
+    
+    return changes
@@ -0,0 +1,164 @@
+"""Stockage serveur des parties en cours (blackjack, minebomb)
+
+Le cookie de session ne contient plus que l'identifiant opaque de la partie ;
+l'état (sabot, mains, grille...) reste côté serveur, avec expiration (TTL).
+
+Backends (GAME_STATE_BACKEND) :
+    memory  LRU en mémoire du worker (un seul worker ou sessions collantes)
+    sql     table game_states, partagée par tous les workers (défaut)
+    redis   serveur Redis local ou compatible (GAME_STATE_REDIS_URL)
+
+Les états doivent rester sérialisables en JSON. Les méthodes ne commitent
+pas : avec le backend SQL, l'écriture part dans le commit de la route.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm.attributes import flag_modified
+
+from models import db, GameState
+
+
+class MemoryStore:
+    """LRU en mémoire du processus, avec expiration paresseuse"""
+    
+    def __init__(self, ttl, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, state = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return state
+    
+    def put(self, key, state):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, state)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+    
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+    
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def purge_expired(self):
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, (expires_at, _) in self._data.items() if expires_at <= now]
+            for key in expired:
+                del self._data[key]
+        return len(expired)
+
+
+class SQLStore:
+    """Table game_states : partagée entre workers, écrite dans la transaction de la route"""
+    
+    # Purge opportuniste des parties abandonnées toutes les N créations
+    PURGE_EVERY = 1000
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._puts = 0
+    
+    def get(self, key):
+        row = db.session.get(GameState, key)
+        if row is None or row.expires_at <= datetime.utcnow():
+            return None
+        return row.data
+    
+    def put(self, key, state):
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        row = db.session.get(GameState, key)
+        if row is None:
+            db.session.add(GameState(id=key, data=state, expires_at=expires_at))
+            self._puts += 1
+            if self._puts % self.PURGE_EVERY == 0:
+                self.purge_expired()
+        else:
+            row.data = state
+            row.expires_at = expires_at
+            flag_modified(row, 'data')
+    
+    def pop(self, key):
+        """Supprime et renvoie l'état en une requête (une partie ne se règle qu'une fois)"""
+        data = db.session.execute(
+            db.delete(GameState)
+            .where(GameState.id == key, GameState.expires_at > datetime.utcnow())
+            .returning(GameState.data),
+            execution_options={'synchronize_session': False}
+        ).scalar()
+        row = db.session.identity_map.get(db.session.identity_key(GameState, key))
+        if row is not None:
+            db.session.expunge(row)
+        return data
+    
+    def delete(self, key):
+        self.pop(key)
+    
+    def purge_expired(self):
+        return GameState.query.filter(GameState.expires_at <= datetime.utcnow()) \
+            .delete(synchronize_session=False)
+
+
+class RedisStore:
+    """Redis (ou compatible) : TTL natif, partagé entre workers et machines"""
+    
+    def __init__(self, ttl, url, prefix='casinoeuil:game:'):
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("GAME_STATE_BACKEND=redis nécessite le paquet 'redis'") from exc
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+    
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+    
+    def put(self, key, state):
+        self._client.setex(self.prefix + key, self.ttl, json.dumps(state, separators=(',', ':')))
+    
+    def pop(self, key):
+        raw = self._client.getdel(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+    
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+    
+    def purge_expired(self):
+        return 0
+
+
+def create_store(config):
+    """Instancie le backend choisi par GAME_STATE_BACKEND"""
+    backend = config.get('GAME_STATE_BACKEND', 'sql')
+    ttl = config.get('GAME_STATE_TTL', 3600)
+    
+    if backend == 'memory':
+        return MemoryStore(ttl, config.get('GAME_STATE_MAX_ENTRIES', 10000))
+    if backend == 'sql':
+        return SQLStore(ttl)
+    if backend == 'redis':
+        return RedisStore(ttl, config.get('GAME_STATE_REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f"Backend de parties inconnu : {backend}")
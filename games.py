@@ -0,0 +1,125 @@
+"""Règles de paiement des jeux, sous forme de fonctions pures
+
+Utilisées par les routes de app.py et reprises (constantes et formules) par
+le simulateur Monte Carlo (simulator.py) : une modification des gains se fait
+ici et se vérifie avec le simulateur avant d'être déployée.
+
+Les tirages (draw_*) prennent le générateur en paramètre (pool CSPRNG ou
+tirage vérifiable de rng.py) : la vérification d'une partie rejoue la même
+fonction.
+"""
+from cards import new_shoe
+
+# ============================================
+# ROULETTE
+# ============================================
+
+RED_NUMBERS = frozenset({1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36})
+ROULETTE_COLOR_MULTIPLIER = 2
+ROULETTE_NUMBER_MULTIPLIER = 35
+
+
+def roulette_color(number):
+    """Couleur d'un numéro de roulette (0 = vert)"""
+    if number == 0:
+        return 'Green'
+    return 'Red' if number in RED_NUMBERS else 'Black'
+
+
+def roulette_multiplier(mode, choice, number):
+    """Multiplicateur de la mise (0 si perdu) pour un pari couleur ou numéro"""
+    if mode == 'color':
+        return ROULETTE_COLOR_MULTIPLIER if choice == roulette_color(number) else 0
+    return ROULETTE_NUMBER_MULTIPLIER if int(choice) == number else 0
+
+
+# ============================================
+# SLOTS
+# ============================================
+
+SLOT_SYMBOLS = ('🎰', '🍋', '🍊', '🍇', '7️⃣', '💎')
+SLOT_TRIPLE_MULTIPLIERS = {
+    '💎': 100,
+    '7️⃣': 50,
+    '🎰': 20,
+    '🍋': 15,
+    '🍊': 12,
+    '🍇': 10
+}
+SLOT_PAIR_MULTIPLIER = 2
+
+
+def slots_multiplier(reels):
+    """Multiplicateur pour trois rouleaux : brelan, paire ou perdu (0)"""
+    first, second, third = reels
+    if first == second == third:
+        return SLOT_TRIPLE_MULTIPLIERS.get(first, 10)
+    if first == second or second == third or first == third:
+        return SLOT_PAIR_MULTIPLIER
+    return 0
+
+
+# ============================================
+# MINEBOMB
+# ============================================
+
+MINEBOMB_CELLS = 25
+
+
+def minebomb_multiplier(diamonds, bombs):
+    """Multiplicateur après `diamonds` cases sûres (fonctionne aussi sur des tableaux NumPy)"""
+    return 1 + (diamonds * 0.3 * (bombs / 5))
+
+
+# ============================================
+# BLACKJACK
+# ============================================
+
+DEALER_STANDS_ON = 17
+
+
+def blackjack_result(player_total, dealer_total):
+    """Résultat d'une main terminée : 'win', 'lose' ou 'draw'"""
+    if player_total > 21:
+        return 'lose'
+    if dealer_total > 21 or player_total > dealer_total:
+        return 'win'
+    if player_total < dealer_total:
+        return 'lose'
+    return 'draw'
+
+
+# Mise rendue par résultat (gain compris)
+BLACKJACK_PAYOUTS = {'win': 2, 'draw': 1, 'lose': 0}
+
+
+def profit_for(bet, multiplier):
+    """Profit net d'un pari : ce qui est rendu moins la mise"""
+    return int(bet * multiplier) - bet
+
+
+# ============================================
+# TIRAGES
+# ============================================
+
+def draw_roulette(rng):
+    """Numéro de roulette (0..36)"""
+    return rng.randint(0, 36)
+
+
+def draw_slots(rng):
+    """Trois rouleaux"""
+    return [rng.choice(SLOT_SYMBOLS) for _ in range(3)]
+
+
+def draw_minebomb(rng, bombs):
+    """Grille mélangée de MINEBOMB_CELLS cases dont `bombs` bombes"""
+    grid = ['safe'] * (MINEBOMB_CELLS - bombs) + ['bomb'] * bombs
+    rng.shuffle(grid)
+    return grid
+
+
+def draw_blackjack(rng):
+    """Nombre de jeux (1 à 8) et sabot mélangé ; les cartes sont tirées par la fin"""
+    num_decks = rng.randint(1, 8)
+    return num_decks, new_shoe(num_decks, rng)
@@ -0,0 +1,106 @@
+"""Compteurs globaux accumulés en mémoire du worker puis versés par lots
+
+Un compteur chaud (clics, tours joués...) ne coûte qu'une addition sous verrou
+sur le chemin de la requête. Le delta n'est mis en attente qu'au commit de la
+transaction de la route (ledger.on_commit) : un rollback ne compte rien. Un
+thread du worker verse les deltas toutes les GLOBAL_STATS_FLUSH_SECONDS
+secondes par GlobalStats.increment (upsert atomique) : la valeur en base est
+exacte après chaque versement. Avec un intervalle à 0, chaque incrément part
+directement dans la transaction de la route.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from functools import partial
+
+from ledger import on_commit
+from models import db, GlobalStats, touch
+
+logger = logging.getLogger(__name__)
+
+
+class GlobalCounters:
+    """Accumulateur de deltas par clé, vidé périodiquement en base"""
+    
+    def __init__(self):
+        self.app = None
+        self.interval = 0
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+    
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('GLOBAL_STATS_FLUSH_SECONDS', 5)
+    
+    def add(self, key, value=1):
+        """Compte value pour key si la transaction en cours est validée"""
+        if not value:
+            return
+        if self.interval <= 0:
+            touch('global')
+            GlobalStats.increment(key, value)
+            return
+        on_commit(partial(self._queue, key, value))
+    
+    def _queue(self, key, value):
+        self._ensure_started()
+        with self._lock:
+            self._pending[key] += value
+    
+    def value(self, key):
+        """Valeur en base plus les deltas de ce worker pas encore versés"""
+        with self._lock:
+            pending = self._pending.get(key, 0)
+        return GlobalStats.get_value(key) + pending
+    
+    def flush(self):
+        """Verse les deltas accumulés en une transaction ; remis en attente en cas d'échec"""
+        with self._lock:
+            deltas, self._pending = self._pending, Counter()
+        if not deltas:
+            return 0
+        with self.app.app_context():
+            try:
+                for key, value in sorted(deltas.items()):
+                    GlobalStats.increment(key, value)
+                touch('global')
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._lock:
+                    self._pending.update(deltas)
+                logger.exception("Échec du versement de %d compteurs globaux", len(deltas))
+                return 0
+        return len(deltas)
+    
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # Après un fork, les deltas du parent appartiennent au parent
+                self._pending = Counter()
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='global-counters', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+                atexit.register(self.close)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+    
+    def close(self):
+        """Arrête le thread et verse les derniers deltas (arrêt du worker)"""
+        if self._pid != os.getpid():
+            return
+        self._stop.set()
+        self.flush()
+
+
+global_counters = GlobalCounters()
@@ -0,0 +1,45 @@
+"""Configuration gunicorn (lue automatiquement dans le répertoire courant)
+
+Avec GUNICORN_PRELOAD=1 (défaut), l'application est importée une seule fois
+par le maître puis partagée par fork : un worker démarre sans réimporter
+Flask, SQLAlchemy ni les modèles, et un redémarrage progressif (HUP) ne coûte
+que le fork. Les connexions éventuellement ouvertes par le maître sont
+abandonnées dans chaque worker (post_fork) ; les files en mémoire des workers
+sont vidées à leur arrêt (worker_exit).
+
+Le schéma n'est pas créé ici : flask --app app db init && flask --app app db seed.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+# Threads : une connexion SSE (/api/stream) occupe un thread, presque toujours endormi. Les flux ont droit
+# à tous les threads sauf STREAM_RESERVED_THREADS, gardés aux requêtes de jeu (et à la moitié au moins)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 32))
+_reserved = int(os.environ.get('STREAM_RESERVED_THREADS', 8))
+# Fichier lu avant l'import de l'application : app.py reprend ce plafond (sauf valeur explicite)
+os.environ.setdefault('STREAM_MAX_SUBSCRIBERS', str(max(threads - _reserved, threads // 2, 1)))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+
+def post_fork(server, worker):
+    """Le pool de connexions hérité du maître ne doit pas être partagé entre processus"""
+    if not server.cfg.preload_app:
+        return
+    from app import app
+    from models import db
+    
+    with app.app_context():
+        # close=False : ne ferme pas les connexions du maître, les oublie seulement
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    """Verse l'historique en attente et les compteurs globaux avant la fin du worker"""
+    from global_counters import global_counters
+    from history_writer import history_writer
+    
+    history_writer.close()
+    global_counters.close()
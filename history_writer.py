@@ -0,0 +1,119 @@
+"""Écriture différée (write-behind) de l'historique des parties
+
+Mode optionnel (GAME_HISTORY_WRITE_BEHIND=1). La mise, le gain et les
+agrégats restent écrits dans la transaction de la route ; seule la ligne
+GameHistory, qui ne sert qu'à l'historique, est mise en file après le commit
+puis insérée par lots par un thread du worker : tous les
+GAME_HISTORY_BATCH_SIZE lignes ou toutes les GAME_HISTORY_FLUSH_MS ms.
+
+File pleine (GAME_HISTORY_QUEUE_SIZE) : la ligne est insérée tout de suite,
+dans la requête qui l'a produite (contre-pression). La file est vidée à
+l'arrêt du worker (atexit). /api/history peut avoir un retard d'un lot.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from models import db, GameHistory
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class HistoryWriter:
+    """File bornée et thread d'insertion par lots (démarré dans le worker, après le fork)"""
+    
+    RETRIES = 3
+    
+    def __init__(self):
+        self.enabled = False
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('GAME_HISTORY_WRITE_BEHIND', False)
+        self.batch_size = app.config.get('GAME_HISTORY_BATCH_SIZE', 500)
+        self.interval = app.config.get('GAME_HISTORY_FLUSH_MS', 200) / 1000
+        self.queue_size = app.config.get('GAME_HISTORY_QUEUE_SIZE', 10000)
+    
+    @staticmethod
+    def row(history):
+        return {column.key: getattr(history, column.key)
+                for column in GameHistory.__table__.columns if column.key != 'id'}
+    
+    def submit(self, row):
+        """Met la ligne en file ; si la file est pleine, l'insère immédiatement"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Appelé après le commit de la route : connexion dédiée, hors de la session
+            with db.engine.begin() as connection:
+                connection.execute(db.insert(GameHistory), [row])
+    
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+                atexit.register(self.close)
+    
+    def _run(self):
+        with self.app.app_context():
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.interval
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._write(batch)
+    
+    def _write(self, rows):
+        for attempt in range(1, self.RETRIES + 1):
+            try:
+                db.session.execute(db.insert(GameHistory), rows)
+                db.session.commit()
+                return
+            except Exception:
+                db.session.rollback()
+                logger.exception("Échec de l'insertion de %d parties (essai %d/%d)", len(rows), attempt, self.RETRIES)
+                time.sleep(0.1 * attempt)
+        # Dernier recours : les lignes restent récupérables depuis les journaux
+        for row in rows:
+            logger.error("Partie non enregistrée : %s", json.dumps(row, default=str, ensure_ascii=False))
+    
+    def close(self, timeout=10):
+        """Vide la file et arrête le thread (arrêt du worker)"""
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+
+history_writer = HistoryWriter()
@@ -0,0 +1,120 @@
+"""GET conditionnels (ETag / If-None-Match) et compression des réponses JSON
+
+Les routes interrogées en boucle (stats globales, clicker, stats du joueur)
+portent un ETag tiré de compteurs de version stockés en base, donc partagés
+par tous les workers et croissants : users.data_version pour un joueur, la
+stat globale 'etag_version' pour les stats globales. Une transaction qui
+modifie ces données les note avec models.touch() ; les compteurs sont
+incrémentés juste avant son commit, dans la même transaction (un rollback
+les annule). Un client qui renvoie l'ETag courant reçoit un 304 après une
+seule lecture indexée du compteur, sans que la vue soit appelée.
+
+Les clics sont versés par lots (global_counters) : le total des clics ne
+change l'ETag global qu'au versement, au plus GLOBAL_STATS_FLUSH_SECONDS plus tard.
+
+Les corps JSON d'au moins COMPRESS_MIN_SIZE octets sont compressés en brotli
+(paquet `brotli` optionnel) ou en gzip selon Accept-Encoding.
+"""
+import gzip
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, GlobalStats, User
+
+try:
+    import brotli
+except ImportError:  # Optionnel : gzip seul
+    brotli = None
+
+
+VERSION_KEY = 'etag_version'
+
+
+class HttpCache:
+    """Versions des ressources interrogées, réponses 304 et compression"""
+    
+    def __init__(self):
+        self.enabled = True
+        self.min_size = 512
+        self.level = 6
+    
+    def init_app(self, app):
+        self.enabled = app.config.get('ETAG_ENABLED', True)
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 512)
+        self.level = app.config.get('COMPRESS_LEVEL', 6)
+        app.after_request(self.compress)
+    
+    @staticmethod
+    def version(key):
+        """Version courante de la ressource, lue en base (même valeur sur tous les workers)"""
+        if key[0] == 'user':
+            version = db.session.query(User.data_version).filter_by(id=key[1]).scalar()
+            return f'u{key[1]}.{version or 0}'
+        return f'g{GlobalStats.get_value(VERSION_KEY)}'
+    
+    def conditional(self, *keys):
+        """ETag tiré des versions des clés (fonctions appelées par requête) ; 304 si le client l'a déjà"""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                # Versions lues avant la vue : une modification pendant celle-ci invalide l'ETag
+                etag = '-'.join(self.version(key()) for key in keys)
+                if request.if_none_match.contains_weak(etag):
+                    response = current_app.response_class(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            return wrapper
+        return decorator
+    
+    def compress(self, response):
+        """after_request : compresse un corps JSON assez gros si le client l'accepte"""
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+                or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+        
+        response.vary.add('Accept-Encoding')
+        if brotli is not None and request.accept_encodings['br']:
+            response.set_data(brotli.compress(data, quality=min(self.level, 11)))
+            response.headers['Content-Encoding'] = 'br'
+        elif request.accept_encodings['gzip']:
+            response.set_data(gzip.compress(data, compresslevel=self.level))
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+
+http_cache = HttpCache()
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_touched(session):
+    """Incrémente les versions des ressources modifiées, dans la transaction qui se termine"""
+    touched = session.info.pop('touched', None)
+    if not touched:
+        return
+    users = {key[1] for key in touched if key[0] == 'user'}
+    if users:
+        session.execute(
+            db.update(User).where(User.id.in_(users))
+            .values(data_version=db.func.coalesce(User.data_version, 0) + 1),
+            execution_options={'synchronize_session': False}
+        )
+    if ('global',) in touched:
+        GlobalStats.increment(VERSION_KEY)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_touched(session):
+    session.info.pop('touched', None)
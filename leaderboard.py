@@ -0,0 +1,177 @@
+"""Classements (plus riches, plus gros gain, profit de la semaine)
+
+Chaque worker garde, par classement, les K meilleurs scores dans une liste
+triée (K = 2 × la taille servie). Les lectures ne touchent pas la base : une
+tranche de liste, plus un COUNT indexé pour le rang d'un joueur hors du top.
+
+Invariant : tous les membres de la liste ont un score >= `floor`, et tout
+joueur absent a un score <= `floor`. Chaque règlement commité sur ce worker
+met la liste à jour en O(log K) ; un membre qui passe sous `floor` en sort.
+Les parties jouées sur les autres workers arrivent par le rechargement
+périodique (LEADERBOARD_REFRESH secondes), une requête indexée ORDER BY
+score DESC LIMIT K.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+
+from cache import TTLCache
+from ledger import bet_settled, on_commit
+from models import db, User, UserStats, WeeklyProfit
+
+BOARDS = ('richest', 'biggest_win', 'weekly_profit')
+
+
+def current_week():
+    return WeeklyProfit.week_of(datetime.utcnow().date())
+
+
+class Board:
+    """Top K d'un classement en mémoire du worker"""
+    
+    def __init__(self, name, size=50, refresh=5):
+        self.name = name
+        self.size = size
+        self.capacity = size * 2
+        self.refresh = refresh
+        self._entries = []  # (-score, user_id), trié : meilleur score en tête
+        self._scores = {}
+        self._names = {}
+        self._floor = None  # None : la liste contient tous les joueurs classés
+        self._loaded_at = None
+        self._period = None
+        self._lock = threading.Lock()
+    
+    # Colonne de score, requête du top et filtre de période propres à chaque classement
+    def score_column(self):
+        return {'richest': User.money, 'biggest_win': UserStats.biggest_win,
+                'weekly_profit': WeeklyProfit.profit}[self.name]
+    
+    def base_query(self, *columns):
+        query = db.session.query(*columns)
+        if self.name == 'biggest_win':
+            query = query.select_from(UserStats).join(User, User.id == UserStats.user_id) \
+                .filter(UserStats.biggest_win > 0)
+        elif self.name == 'weekly_profit':
+            query = query.select_from(WeeklyProfit).join(User, User.id == WeeklyProfit.user_id) \
+                .filter(WeeklyProfit.week_start == self._period)
+        return query
+    
+    def period(self):
+        return current_week() if self.name == 'weekly_profit' else None
+    
+    def load(self):
+        """Recharge le top K depuis la base (requête sur l'index du score)"""
+        period = self.period()
+        column = self.score_column()
+        with self._lock:
+            self._period = period
+            rows = self.base_query(column, User.id, User.username) \
+                .order_by(column.desc(), User.id).limit(self.capacity).all()
+            self._entries = [(-score, user_id) for score, user_id, _ in rows]
+            self._scores = {user_id: score for score, user_id, _ in rows}
+            self._names = {user_id: username for _, user_id, username in rows}
+            self._floor = rows[-1][0] if len(rows) == self.capacity else None
+            self._loaded_at = time.monotonic()
+    
+    def ensure_fresh(self):
+        if (self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh
+                or len(self._entries) < self.size and self._floor is not None
+                or self._period != self.period()):
+            self.load()
+    
+    def update(self, user_id, username, score):
+        """Applique le nouveau score d'un joueur (après commit, sans requête)"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            old = self._scores.pop(user_id, None)
+            if old is not None:
+                del self._entries[bisect_left(self._entries, (-old, user_id))]
+            
+            if self._floor is not None and score <= self._floor:
+                # Sous le plancher : des joueurs absents peuvent le dépasser
+                self._names.pop(user_id, None)
+                return
+            
+            insort(self._entries, (-score, user_id))
+            self._scores[user_id] = score
+            self._names[user_id] = username
+            
+            while len(self._entries) > self.capacity:
+                neg_score, dropped = self._entries.pop()
+                del self._scores[dropped]
+                del self._names[dropped]
+                self._floor = -neg_score if self._floor is None else max(self._floor, -neg_score)
+    
+    def top(self, limit):
+        with self._lock:
+            return [{'rank': rank, 'username': self._names[user_id], 'score': -neg_score}
+                    for rank, (neg_score, user_id) in enumerate(self._entries[:limit], start=1)]
+    
+    def rank_of(self, user_id):
+        """(rang, score) du joueur, ou None s'il n'est pas classé"""
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is not None:
+                return bisect_left(self._entries, (-score, user_id)) + 1, score
+        
+        column = self.score_column()
+        score = self.base_query(column).filter(User.id == user_id).scalar()
+        if score is None:
+            return None
+        # Rang hors du top : COUNT sur l'index du score (égalités départagées par id)
+        ahead = self.base_query(db.func.count()).filter(
+            db.or_(column > score, db.and_(column == score, User.id < user_id))).scalar()
+        return ahead + 1, score
+
+
+class Leaderboards:
+    """Les classements du worker et le rang (mis en cache) de chaque joueur"""
+    
+    def __init__(self, size=50, refresh=5, rank_ttl=5):
+        self.boards = {name: Board(name, size, refresh) for name in BOARDS}
+        self.ranks = TTLCache(ttl=rank_ttl)
+    
+    def configure(self, size, refresh, rank_ttl):
+        for board in self.boards.values():
+            board.size, board.capacity, board.refresh = size, size * 2, refresh
+            board._loaded_at = None
+        self.ranks.ttl = rank_ttl
+    
+    def get(self, name, user_id=None, limit=None):
+        board = self.boards[name]
+        board.ensure_fresh()
+        limit = min(limit or board.size, board.size)
+        
+        result = {'board': name, 'entries': board.top(limit)}
+        if name == 'weekly_profit':
+            result['week_start'] = board.period().isoformat()
+        if user_id is not None:
+            key = (name, user_id)
+            me = self.ranks.get(key)
+            if me is None:
+                me = board.rank_of(user_id)
+                self.ranks.set(key, me or False)
+            result['me'] = {'rank': me[0], 'score': me[1]} if me else None
+        return result
+    
+    def apply(self, user_id, username, scores):
+        for name, score in scores.items():
+            self.boards[name].update(user_id, username, score)
+            self.ranks.invalidate((name, user_id))
+
+
+leaderboards = Leaderboards()
+
+
+@bet_settled.connect
+def on_bet_settled(user, history, before, after, **extra):
+    """Cumule le profit de la semaine, puis met les classements à jour une fois la partie commitée"""
+    weekly = WeeklyProfit.record(user.id, current_week(), history.profit or 0)
+    user_id, username = user.id, user.username
+    scores = {'richest': user.money, 'weekly_profit': weekly}
+    if after.get('biggest_win', 0) > 0:
+        scores['biggest_win'] = after['biggest_win']
+    on_commit(lambda: leaderboards.apply(user_id, username, scores))
@@ -0,0 +1,80 @@
+"""Couche transactionnelle des paris : une partie complète = un seul commit
+
+Les fonctions de ce module ne commitent jamais : la route appelante fait un
+unique db.session.commit() une fois la mise, le gain, l'historique et les
+agrégats posés dans la session. En cas d'erreur, la session est annulée au
+teardown de la requête.
+
+Chaque règlement émet le signal `bet_settled` (toujours avant le commit) :
+les abonnés (succès, classements...) ajoutent leur travail à la même
+transaction. Le travail hors base (caches mémoire...) passe par on_commit()
+pour ne s'appliquer qu'une fois la transaction validée.
+"""
+from blinker import Namespace
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from datetime import datetime
+from functools import partial
+
+from history_writer import history_writer
+from models import db, GameHistory, GameStats, UserStats
+
+signals = Namespace()
+
+# Émis par settle_game(user, history=..., before=..., after=...) avec les compteurs de UserStats
+bet_settled = signals.signal('bet-settled')
+
+
+def on_commit(callback):
+    """Exécute callback() après le commit de la transaction en cours (abandonné en cas de rollback)"""
+    db.session.info.setdefault('on_commit', []).append(callback)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_on_commit(session):
+    for callback in session.info.pop('on_commit', ()):
+        callback()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_on_commit(session):
+    session.info.pop('on_commit', None)
+
+
+def place_bet(user, bet):
+    """Règle le revenu passif puis débite la mise (UPDATE conditionnel, lève InsufficientFunds)"""
+    user.settle_passive_income()
+    user.remove_money(bet)
+
+
+def settle_game(user, game_type, bet, result, profit, multiplier, details):
+    """Crédite le gain, enregistre la partie et met à jour les agrégats (sans commit)"""
+    user.settle_passive_income()
+    
+    payout = bet + profit
+    if payout > 0:
+        user.add_money(payout)
+    
+    history = GameHistory(
+        user_id=user.id,
+        game_type=game_type,
+        bet_amount=bet,
+        result=result,
+        profit=profit,
+        multiplier=multiplier,
+        details=details,
+        played_at=datetime.utcnow()
+    )
+    GameStats.record(history)
+    before, after = UserStats.record(history, user.money)
+    
+    # La ligne d'historique part dans la transaction, ou en file après le commit (write-behind)
+    if history_writer.enabled:
+        on_commit(partial(history_writer.submit, history_writer.row(history)))
+    else:
+        db.session.add(history)
+    
+    bet_settled.send(user, history=history, before=before, after=after)
+    
+    return history
@@ -0,0 +1,332 @@
+"""Instrumentation par requête : latences, requêtes SQL, commits et profilage
+
+Hooks Flask (before/after_request) et événements SQLAlchemy (curseur et
+commit) alimentent un registre en mémoire du worker, exposé au format texte
+Prometheus sur /metrics.
+
+    casinoeuil_http_request_duration_seconds   histogramme par route
+    casinoeuil_http_requests_total             par route et statut
+    casinoeuil_db_statements_per_request       histogramme par route (N+1)
+    casinoeuil_db_seconds_total                temps passé dans la base, par route
+    casinoeuil_db_commits_total                commits, par route
+    casinoeuil_db_commit_duration_seconds      durée des commits (attente du verrou SQLite)
+    casinoeuil_db_slow_queries_total           requêtes lentes, par ligne de code appelante
+
+Configuration (app.config) :
+    METRICS_SERVER_TIMING   ajoute l'en-tête Server-Timing (app, db) à chaque réponse
+    METRICS_SLOW_QUERY_MS   seuil des requêtes lentes, journalisées avec leur appelant
+    METRICS_TOKEN           si défini, /metrics exige « Authorization: Bearer <token> »
+    METRICS_DIR             dossier partagé : chaque worker y dépose son registre
+                            et /metrics les additionne (plusieurs workers gunicorn)
+    PROFILE_ENDPOINTS       routes (noms d'endpoint) à profiler par échantillonnage ;
+                            piles agrégées sur /metrics/profile (format « collapsed »
+                            de flamegraph.pl et speedscope)
+    PROFILE_INTERVAL_MS     période d'échantillonnage
+"""
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, defaultdict
+
+from flask import Response, request, abort
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+PREFIX = 'casinoeuil_'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+HELP = {
+    'http_request_duration_seconds': ('histogram', "Durée des requêtes HTTP"),
+    'http_requests_total': ('counter', "Requêtes HTTP traitées"),
+    'db_statements_per_request': ('histogram', "Requêtes SQL par requête HTTP"),
+    'db_seconds_total': ('counter', "Temps passé à exécuter du SQL"),
+    'db_commits_total': ('counter', "Commits de transaction"),
+    'db_commit_duration_seconds': ('histogram', "Durée des commits (flush et attente du verrou compris)"),
+    'db_slow_queries_total': ('counter', "Requêtes SQL au-dessus du seuil, par appelant"),
+}
+
+
+class Registry:
+    """Compteurs et histogrammes étiquetés, sérialisables pour la fusion entre workers"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)
+        self.histograms = {}
+    
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self.counters[(name, labels)] += value
+    
+    def observe(self, name, labels, value, buckets):
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = {'buckets': buckets, 'counts': [0] * len(buckets),
+                                                                'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+    
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), dict(h, counts=list(h['counts']))]
+                               for (name, labels), h in self.histograms.items()],
+            }
+    
+    @staticmethod
+    def merge(snapshots):
+        merged = Registry()
+        for snapshot in snapshots:
+            for name, labels, value in snapshot['counters']:
+                merged.counters[(name, tuple(map(tuple, labels)))] += value
+            for name, labels, histogram in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                target = merged.histograms.setdefault(key, {'buckets': tuple(histogram['buckets']),
+                                                            'counts': [0] * len(histogram['buckets']),
+                                                            'sum': 0.0, 'count': 0})
+                target['counts'] = [a + b for a, b in zip(target['counts'], histogram['counts'])]
+                target['sum'] += histogram['sum']
+                target['count'] += histogram['count']
+        return merged
+    
+    def render(self):
+        """Format texte d'exposition Prometheus"""
+        lines = []
+        series = defaultdict(list)
+        for (name, labels), value in sorted(self.counters.items()):
+            series[name].append(f'{PREFIX}{name}{_labels(labels)} {value:g}')
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram['buckets'], histogram['counts']):
+                cumulative += count
+                series[name].append(f'{PREFIX}{name}_bucket{_labels(labels + (("le", f"{bound:g}"),))} {cumulative}')
+            series[name].append(f'{PREFIX}{name}_bucket{_labels(labels + (("le", "+Inf"),))} {histogram["count"]}')
+            series[name].append(f'{PREFIX}{name}_sum{_labels(labels)} {histogram["sum"]:g}')
+            series[name].append(f'{PREFIX}{name}_count{_labels(labels)} {histogram["count"]}')
+        for name, samples in series.items():
+            kind, description = HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {PREFIX}{name} {description}')
+            lines.append(f'# TYPE {PREFIX}{name} {kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+class SamplingProfiler:
+    """Échantillonne les piles des threads qui traitent une route profilée"""
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._thread = None
+    
+    def start(self, endpoint):
+        with self._lock:
+            self._threads[threading.get_ident()] = endpoint
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='metrics-profiler', daemon=True)
+                self._thread.start()
+    
+    def stop(self):
+        with self._lock:
+            self._threads.pop(threading.get_ident(), None)
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                threads = dict(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for ident, endpoint in threads.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = [f'{code.co_filename.rsplit(os.sep, 1)[-1]}:{code.co_name}'
+                         for code in (f.f_code for f, _ in traceback.walk_stack(frame))]
+                stack.append(endpoint)
+                self.stacks[';'.join(reversed(stack))] += 1
+    
+    def collapsed(self, reset=False):
+        lines = '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common())
+        if reset:
+            self.stacks.clear()
+        return lines + '\n'
+
+
+class Metrics:
+    """Branche les hooks sur l'app et le moteur, et sert /metrics"""
+    
+    def __init__(self):
+        self.registry = Registry()
+        self.profiler = None
+        self._local = threading.local()
+        self._dumped_at = 0
+    
+    def init_app(self, app, engine):
+        self.app = app
+        self.root = app.root_path + os.sep
+        self.server_timing = app.config.get('METRICS_SERVER_TIMING', False)
+        self.slow_query = app.config.get('METRICS_SLOW_QUERY_MS', 100) / 1000
+        self.token = app.config.get('METRICS_TOKEN')
+        self.directory = app.config.get('METRICS_DIR')
+        self.profiled = set(app.config.get('PROFILE_ENDPOINTS', ()))
+        if self.profiled:
+            self.profiler = SamplingProfiler(app.config.get('PROFILE_INTERVAL_MS', 5) / 1000)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.add_url_rule('/metrics/profile', 'metrics_profile', self.profile_view)
+        
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(Session, 'before_commit', self._before_commit)
+        event.listen(Session, 'after_commit', self._after_commit)
+    
+    # Requête HTTP
+    
+    def _before_request(self):
+        state = self._local
+        state.started = time.perf_counter()
+        state.statements = 0
+        state.db_time = 0.0
+        state.commits = 0
+        state.endpoint = request.endpoint or 'not_found'
+        if self.profiler is not None and state.endpoint in self.profiled:
+            self.profiler.start(state.endpoint)
+    
+    def _after_request(self, response):
+        state = self._local
+        if getattr(state, 'started', None) is None:
+            return response
+        duration = time.perf_counter() - state.started
+        route = (('endpoint', state.endpoint),)
+        
+        self.registry.observe('http_request_duration_seconds', route + (('method', request.method),),
+                              duration, LATENCY_BUCKETS)
+        self.registry.inc('http_requests_total', route + (('method', request.method),
+                                                           ('status', str(response.status_code))))
+        self.registry.observe('db_statements_per_request', route, state.statements, STATEMENT_BUCKETS)
+        self.registry.inc('db_seconds_total', route, state.db_time)
+        if state.commits:
+            self.registry.inc('db_commits_total', route, state.commits)
+        
+        if self.server_timing:
+            response.headers.add('Server-Timing', f'app;dur={duration * 1000:.2f}')
+            response.headers.add('Server-Timing',
+                                 f'db;dur={state.db_time * 1000:.2f};desc="{state.statements} statements"')
+        return response
+    
+    def _teardown_request(self, exc):
+        if self.profiler is not None:
+            self.profiler.stop()
+        self._local.started = None
+        if self.directory and time.monotonic() - self._dumped_at >= 1:
+            self._dumped_at = time.monotonic()
+            self.dump()
+    
+    # SQLAlchemy
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['metrics_started'] = time.perf_counter()
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('metrics_started', time.perf_counter())
+        state = self._local
+        if getattr(state, 'started', None) is not None:
+            state.statements += 1
+            state.db_time += elapsed
+        if elapsed >= self.slow_query:
+            location = self._caller()
+            self.registry.inc('db_slow_queries_total', (('location', location),))
+            self.app.logger.warning("Requête SQL lente (%.1f ms) depuis %s : %s",
+                                    elapsed * 1000, location, ' '.join(statement.split())[:200])
+    
+    def _caller(self):
+        """Première ligne du code de l'application dans la pile (hors ce module)"""
+        for frame in reversed(traceback.extract_stack()):
+            if frame.filename.startswith(self.root) and not frame.filename.endswith('metrics.py') \
+                    and 'site-packages' not in frame.filename:
+                return f'{frame.filename[len(self.root):]}:{frame.lineno} {frame.name}'
+        return 'unknown'
+    
+    def _before_commit(self, session):
+        session.info['metrics_commit_started'] = time.perf_counter()
+    
+    def _after_commit(self, session):
+        started = session.info.pop('metrics_commit_started', None)
+        if started is None:
+            return
+        self.registry.observe('db_commit_duration_seconds', (), time.perf_counter() - started, LATENCY_BUCKETS)
+        if getattr(self._local, 'started', None) is not None:
+            self._local.commits += 1
+    
+    # Exposition
+    
+    def dump(self):
+        """Dépose le registre du worker dans METRICS_DIR (remplacement atomique)"""
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(path + '.tmp', path)
+    
+    def collect(self):
+        if not self.directory:
+            return self.registry
+        self.dump()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return Registry.merge(snapshots)
+    
+    def check_token(self, required=False):
+        """401 si METRICS_TOKEN est défini et absent de la requête ; 404 sans jeton configuré si required"""
+        if not self.token:
+            if required:
+                abort(404)
+            return
+        if request.headers.get('Authorization') != f'Bearer {self.token}':
+            abort(401)
+    
+    def metrics_view(self):
+        self.check_token()
+        return Response(self.collect().render(), mimetype='text/plain; version=0.0.4')
+    
+    def profile_view(self):
+        """Piles échantillonnées au format collapsed (?reset=1 pour repartir de zéro)"""
+        self.check_token()
+        if self.profiler is None:
+            return Response("Aucune route profilée (PROFILE_ENDPOINTS)\n", status=404, mimetype='text/plain')
+        return Response(self.profiler.collapsed(reset=request.args.get('reset') == '1'), mimetype='text/plain')
+
+
+metrics = Metrics()
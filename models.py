@@ -1,10 +1,78 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime, timedelta
+
+from cache import TTLCache
+from passwords import hasher
+from upgrades import UPGRADES
 
 db = SQLAlchemy()
 
+# Jeux suivis dans les statistiques
+GAME_TYPES = ('blackjack', 'roulette', 'minebomb', 'slots')
+
+# Revenu passif hors ligne plafonné (en secondes)
+PASSIVE_ACCRUAL_CAP = 8 * 3600
+
+
+class InsufficientFunds(ValueError):
+    """Solde insuffisant pour la mise ou l'achat demandé"""
+
+
+def _upsert_insert():
+    """insert() du dialecte s'il gère ON CONFLICT (PostgreSQL, SQLite), sinon None"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def insert_ignore(table, **values):
+    """INSERT qui ignore un doublon de clé (sans lecture préalable) ; True si la ligne a été créée"""
+    insert = _upsert_insert()
+    if insert is None:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(table).values(**values))
+            return True
+        except IntegrityError:
+            return False
+    
+    result = db.session.execute(insert(table).values(**values).on_conflict_do_nothing())
+    return result.rowcount == 1
+
+
+def insert_ignore_many(table, rows, chunk_size=200):
+    """insert_ignore pour une liste de lignes : un INSERT multi-lignes par paquet si la base le permet"""
+    insert = _upsert_insert()
+    if insert is None:
+        for row in rows:
+            insert_ignore(table, **row)
+        return
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(table).values(rows[start:start + chunk_size]).on_conflict_do_nothing())
+
+
+def touch(*key):
+    """Note une ressource modifiée par la transaction en cours (version des ETag incrémentée avant le commit)"""
+    db.session.info.setdefault('touched', set()).add(key)
+
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _end_settlement(session):
+    """Revenu passif réglé à nouveau dans la transaction suivante (et après annulation du règlement)"""
+    session.info.pop('settled', None)
+
+
 class User(UserMixin, db.Model):
     """Modèle utilisateur"""
     __tablename__ = 'users'
@@ -13,63 +81,141 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(80), unique=True, nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    money = db.Column(db.Integer, default=5000, nullable=False)
+    money = db.Column(db.Integer, default=5000, nullable=False, index=True)  # Index : classement des plus riches
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, default=datetime.utcnow)
+    # Version des données du joueur (ETag), incrémentée au commit de chaque modification (http_cache.py)
+    data_version = db.Column(db.Integer, default=0)
     
     # Relations
     clicker_data = db.relationship('ClickerData', backref='user', uselist=False, cascade='all, delete-orphan')
     game_history = db.relationship('GameHistory', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     achievements = db.relationship('Achievement', secondary='user_achievements', backref='users')
     
+    # Identités (id -> username) connues du worker, pour load_user (TTL réglé par l'app)
+    identity_cache = TTLCache(ttl=60)
+    
     def set_password(self, password):
-        """Hash le mot de passe"""
-        self.password_hash = generate_password_hash(password)
+        """Hash le mot de passe (pool de hachage, peut lever HashingBusy)"""
+        self.password_hash = hasher.hash(password)
     
     def check_password(self, password):
-        """Vérifie le mot de passe"""
-        return check_password_hash(self.password_hash, password)
+        """Vérifie le mot de passe (pool de hachage, peut lever HashingBusy)"""
+        return hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Hachage fait avec une méthode ou des paramètres de coût périmés"""
+        return hasher.needs_rehash(self.password_hash)
     
     def add_money(self, amount):
-        """Ajoute de l'argent (avec validation)"""
+        """Ajoute de l'argent (UPDATE atomique, commit par l'appelant)"""
         if amount < 0:
             raise ValueError("Le montant ne peut pas être négatif")
-        self.money += amount
-        db.session.commit()
+        self._update_money(User.money + amount)
     
     def remove_money(self, amount):
-        """Retire de l'argent (avec validation)"""
+        """Retire de l'argent (UPDATE gardé par money >= amount, commit par l'appelant)"""
         if amount < 0:
             raise ValueError("Le montant ne peut pas être négatif")
-        if self.money < amount:
-            raise ValueError("Fonds insuffisants")
-        self.money -= amount
-        db.session.commit()
+        if not self._update_money(User.money - amount, User.money >= amount):
+            raise InsufficientFunds("Fonds insuffisants")
     
-    def get_stats(self):
-        """Retourne les statistiques du joueur"""
-        games = self.game_history.all()
-        
-        total_games = len(games)
-        total_wins = sum(1 for g in games if g.result == 'win')
-        total_losses = sum(1 for g in games if g.result == 'lose')
-        total_wagered = sum(g.bet_amount for g in games)
-        total_winnings = sum(g.profit for g in games if g.profit > 0)
+    def _update_money(self, value, *conditions):
+        """Modifie le solde côté SQL (pas de lecture-modification-écriture) et resynchronise l'objet"""
+        money = db.session.execute(
+            db.update(User)
+            .where(User.id == self.id, *conditions)
+            .values(money=value)
+            .returning(User.money),
+            execution_options={'synchronize_session': False}
+        ).scalar()
         
-        return {
-            'total_games': total_games,
-            'total_wins': total_wins,
-            'total_losses': total_losses,
-            'win_rate': round((total_wins / total_games * 100), 1) if total_games > 0 else 0,
-            'total_wagered': total_wagered,
-            'total_winnings': total_winnings,
-            'net_profit': total_winnings - total_wagered
-        }
+        if money is None:
+            return False
+        set_committed_value(self, 'money', money)
+        touch('user', self.id)
+        return True
+    
+    def settle_passive_income(self, now=None):
+        """Règle le revenu passif du clicker avant une lecture ou une dépense (sans commit, une fois par transaction)"""
+        # La route règle avant de vérifier le solde, place_bet et settle_game à nouveau : seul le premier appel lit
+        settled = db.session.info.setdefault('settled', set())
+        if self.id in settled:
+            return 0
+        settled.add(self.id)
+        if not self.clicker_data:
+            return 0
+        return self.clicker_data.accrue(now)
+    
+    def get_stats(self):
+        """Retourne les statistiques du joueur (résumé maintenu à chaque partie, mis en cache)"""
+        stats = UserStats.cache.get(self.id)
+        if stats is None:
+            summary = db.session.get(UserStats, self.id) or UserStats.from_history(self.id)
+            stats = summary.to_dict()
+            UserStats.cache.set(self.id, stats)
+        return stats
+    
+    @staticmethod
+    def load_principal(user_id):
+        """Utilisateur de la session (Flask-Login) ; le compte n'est lu qu'une fois par TTL"""
+        username = User.identity_cache.get(user_id)
+        if username is None:
+            username = db.session.query(User.username).filter(User.id == user_id).scalar()
+            if username is None:
+                return None
+            User.identity_cache.set(user_id, username)
+        return UserPrincipal(user_id, username)
     
     def __repr__(self):
         return f'<User {self.username}>'
 
 
+class UserPrincipal:
+    """Joueur connecté : id et pseudo sans requête, ligne User chargée au premier autre attribut"""
+    __slots__ = ('id', 'username', '_user')
+    
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+    
+    def __init__(self, user_id, username):
+        object.__setattr__(self, 'id', user_id)
+        object.__setattr__(self, 'username', username)
+        object.__setattr__(self, '_user', None)
+    
+    def get_id(self):
+        return str(self.id)
+    
+    # N'utilise que self.id : les stats du profil ne chargent pas la ligne User
+    get_stats = User.get_stats
+    
+    @property
+    def user(self):
+        if self._user is None:
+            user = db.session.get(User, self.id)
+            if user is None:
+                User.identity_cache.invalidate(self.id)
+                raise LookupError(f"Utilisateur {self.id} introuvable")
+            object.__setattr__(self, '_user', user)
+        return self._user
+    
+    def __getattr__(self, name):
+        return getattr(self.user, name)
+    
+    def __setattr__(self, name, value):
+        setattr(self.user, name, value)
+    
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id and isinstance(other, (User, UserPrincipal))
+    
+    def __hash__(self):
+        return hash(self.id)
+    
+    def __repr__(self):
+        return f'<UserPrincipal {self.username}>'
+
+
 class ClickerData(db.Model):
     """Données du Money Clicker par utilisateur"""
     __tablename__ = 'clicker_data'
@@ -83,18 +229,70 @@ class ClickerData(db.Model):
     factory_level = db.Column(db.Integer, default=0)
     bank_level = db.Column(db.Integer, default=0)
     
-    click_cost = db.Column(db.Integer, default=10)
-    auto_cost = db.Column(db.Integer, default=50)
-    factory_cost = db.Column(db.Integer, default=200)
-    bank_cost = db.Column(db.Integer, default=1000)
-    
     total_clicks = db.Column(db.Integer, default=0)
     total_earned = db.Column(db.Integer, default=0)
     
+    # Revenu passif réglé jusqu'à cet instant (calcul paresseux, pas d'écriture par seconde)
+    last_accrued_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Seau à jetons des clics : capacité consommée jusqu'à cet instant
+    last_click_at = db.Column(db.DateTime)
+    
     @property
     def passive_income(self):
-        """Calcule le revenu passif"""
-        return self.auto_level + (self.factory_level * 5) + (self.bank_level * 20)
+        """Revenu passif ($/s) des niveaux achetés (table UPGRADES)"""
+        return sum(getattr(self, upgrade.column) * upgrade.income for upgrade in UPGRADES.values())
+    
+    def to_dict(self):
+        return {
+            'clickPower': self.click_power,
+            'clickLevel': self.click_level,
+            'autoLevel': self.auto_level,
+            'factoryLevel': self.factory_level,
+            'bankLevel': self.bank_level,
+            # Prix du prochain niveau, déduit du niveau (plus de colonne de prix)
+            'clickCost': UPGRADES['click'].cost(self.click_level),
+            'autoCost': UPGRADES['auto'].cost(self.auto_level),
+            'factoryCost': UPGRADES['factory'].cost(self.factory_level),
+            'bankCost': UPGRADES['bank'].cost(self.bank_level),
+            'passiveIncome': self.passive_income
+        }
+    
+    def accrue(self, now=None):
+        """Crédite le revenu passif écoulé depuis le dernier règlement (sans commit)"""
+        # Sans revenu, rien à créditer ni à écrire : l'achat d'un niveau remet l'instant à jour (clicker_upgrade)
+        if not self.passive_income:
+            return 0
+        now = now or datetime.utcnow()
+        last = self.last_accrued_at
+        if last is None:
+            accrued_at, amount = now, 0
+        else:
+            elapsed = int((now - last).total_seconds())
+            if elapsed <= 0:
+                return 0
+            # Seules les secondes entières sont consommées, le reste court toujours
+            accrued_at = last + timedelta(seconds=elapsed)
+            amount = min(elapsed, PASSIVE_ACCRUAL_CAP) * self.passive_income
+        
+        if self.id is None:
+            db.session.flush()
+        
+        # UPDATE gardé par l'instant lu : deux requêtes simultanées ne créditent pas deux fois le même intervalle
+        guard = ClickerData.last_accrued_at.is_(None) if last is None else ClickerData.last_accrued_at == last
+        updated = ClickerData.query.filter(ClickerData.id == self.id, guard).update({
+            ClickerData.last_accrued_at: accrued_at,
+            ClickerData.total_earned: db.func.coalesce(ClickerData.total_earned, 0) + amount,
+        }, synchronize_session=False)
+        if updated != 1:
+            # Intervalle déjà réglé par une autre requête : relu au prochain accès
+            db.session.expire(self, ['last_accrued_at', 'total_earned'])
+            return 0
+        
+        set_committed_value(self, 'last_accrued_at', accrued_at)
+        set_committed_value(self, 'total_earned', (self.total_earned or 0) + amount)
+        if amount > 0:
+            self.user.add_money(amount)
+        return amount
     
     def __repr__(self):
         return f'<ClickerData user_id={self.user_id}>'
@@ -105,7 +303,7 @@ class GameHistory(db.Model):
     __tablename__ = 'game_history'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     game_type = db.Column(db.String(20), nullable=False, index=True)  # blackjack, roulette, minebomb, slots
     
     bet_amount = db.Column(db.Integer, nullable=False)
@@ -116,10 +314,325 @@ class GameHistory(db.Model):
     details = db.Column(db.JSON)  # Détails spécifiques au jeu (cartes, numéro roulette, etc.)
     played_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
+    __table_args__ = (
+        # Pagination par curseur (played_at, id) sur l'historique d'un joueur
+        db.Index('ix_game_history_user_played', 'user_id', 'played_at', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'game_type': self.game_type,
+            'bet': self.bet_amount,
+            'result': self.result,
+            'profit': self.profit,
+            'multiplier': self.multiplier,
+            'date': self.played_at.isoformat()
+        }
+    
     def __repr__(self):
         return f'<GameHistory {self.game_type} - {self.result}>'
 
 
+class GameStats(db.Model):
+    """Agrégats par jeu, maintenus à chaque partie (évite de rescanner l'historique)"""
+    __tablename__ = 'game_stats'
+    
+    game_type = db.Column(db.String(20), primary_key=True)
+    games = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    losses = db.Column(db.Integer, default=0, nullable=False)
+    wagered = db.Column(db.Integer, default=0, nullable=False)
+    won = db.Column(db.Integer, default=0, nullable=False)  # Somme des profits positifs
+    biggest_win = db.Column(db.Integer, default=0, nullable=False)
+    biggest_loss = db.Column(db.Integer, default=0, nullable=False)  # Valeur absolue
+    
+    @staticmethod
+    def record(history):
+        """Ajoute une partie à l'agrégat de son jeu (sans commit, même transaction que l'historique)"""
+        profit = history.profit or 0
+        win = 1 if history.result == 'win' else 0
+        loss = 1 if history.result == 'lose' else 0
+        
+        touch('global')
+        
+        # UPDATE atomique : pas de lecture préalable, pas de mise à jour perdue entre workers
+        updated = GameStats.query.filter_by(game_type=history.game_type).update({
+            GameStats.games: GameStats.games + 1,
+            GameStats.wins: GameStats.wins + win,
+            GameStats.losses: GameStats.losses + loss,
+            GameStats.wagered: GameStats.wagered + history.bet_amount,
+            GameStats.won: GameStats.won + max(profit, 0),
+            GameStats.biggest_win: db.case((GameStats.biggest_win < profit, profit), else_=GameStats.biggest_win),
+            GameStats.biggest_loss: db.case((GameStats.biggest_loss < -profit, -profit), else_=GameStats.biggest_loss),
+        }, synchronize_session=False)
+        
+        if not updated:
+            db.session.add(GameStats(
+                game_type=history.game_type,
+                games=1,
+                wins=win,
+                losses=loss,
+                wagered=history.bet_amount,
+                won=max(profit, 0),
+                biggest_win=max(profit, 0),
+                biggest_loss=max(-profit, 0)
+            ))
+    
+    @staticmethod
+    def rebuild():
+        """Recalcule tous les agrégats depuis l'historique (une seule requête groupée)"""
+        rows = db.session.query(
+            GameHistory.game_type,
+            db.func.count(GameHistory.id),
+            db.func.sum(db.case((GameHistory.result == 'win', 1), else_=0)),
+            db.func.sum(db.case((GameHistory.result == 'lose', 1), else_=0)),
+            db.func.sum(GameHistory.bet_amount),
+            db.func.sum(db.case((GameHistory.profit > 0, GameHistory.profit), else_=0)),
+            db.func.max(db.case((GameHistory.profit > 0, GameHistory.profit), else_=0)),
+            db.func.max(db.case((GameHistory.profit < 0, -GameHistory.profit), else_=0)),
+        ).group_by(GameHistory.game_type).all()
+        
+        GameStats.query.delete()
+        stats = {game_type: GameStats(game_type=game_type, games=0, wins=0, losses=0,
+                                      wagered=0, won=0, biggest_win=0, biggest_loss=0)
+                 for game_type in GAME_TYPES}
+        for game_type, games, wins, losses, wagered, won, biggest_win, biggest_loss in rows:
+            stats[game_type] = GameStats(
+                game_type=game_type,
+                games=games,
+                wins=wins or 0,
+                losses=losses or 0,
+                wagered=wagered or 0,
+                won=won or 0,
+                biggest_win=biggest_win or 0,
+                biggest_loss=biggest_loss or 0
+            )
+        db.session.add_all(stats.values())
+        db.session.commit()
+        return list(stats.values())
+    
+    def to_dict(self):
+        return {
+            'games': self.games,
+            'wins': self.wins,
+            'wagered': self.wagered,
+            'won': self.won
+        }
+    
+    def __repr__(self):
+        return f'<GameStats {self.game_type} games={self.games}>'
+
+
+class UserStats(db.Model):
+    """Résumé des parties d'un joueur, mis à jour dans la transaction de chaque partie"""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    games = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    losses = db.Column(db.Integer, default=0, nullable=False)
+    wagered = db.Column(db.Integer, default=0, nullable=False)
+    winnings = db.Column(db.Integer, default=0, nullable=False)  # Somme des profits positifs
+    
+    # Compteurs incrémentaux des succès
+    win_streak = db.Column(db.Integer, default=0, nullable=False)  # Victoires consécutives en cours
+    best_multiplier = db.Column(db.Float, default=0, nullable=False)  # Meilleur multiplicateur gagnant
+    peak_balance = db.Column(db.Integer, default=0, nullable=False)  # Solde maximum après une partie
+    biggest_win = db.Column(db.Integer, default=0, nullable=False, index=True)  # Plus gros profit (classement)
+    
+    # Cache par worker de get_stats(), vidé à la partie suivante du joueur (TTL réglé par l'app)
+    cache = TTLCache(ttl=10)
+    
+    # Compteurs exposés aux succès, par Achievement.condition_type
+    COUNTERS = ('total_games', 'total_wins', 'win_streak', 'max_multiplier', 'peak_balance', 'biggest_win')
+    
+    def counters(self):
+        return dict(zip(UserStats.COUNTERS, (self.games, self.wins, self.win_streak,
+                                             self.best_multiplier, self.peak_balance, self.biggest_win)))
+    
+    @staticmethod
+    def record(history, balance):
+        """Ajoute une partie au résumé du joueur (sans commit) ; renvoie les compteurs avant et après"""
+        UserStats.cache.invalidate(history.user_id)
+        touch('user', history.user_id)
+        
+        summary = db.session.get(UserStats, history.user_id)
+        if summary is None:
+            # Premier résumé du joueur : l'historique déjà écrit est agrégé une fois, puis la
+            # partie courante (pas encore dans la table) est ajoutée comme les suivantes
+            summary = UserStats.from_history(history.user_id, balance)
+            db.session.add(summary)
+            db.session.flush()
+            before = {}
+        else:
+            before = summary.counters()
+        
+        profit = history.profit or 0
+        won = history.result == 'win'
+        multiplier = (history.multiplier or 0) if won else 0
+        
+        # UPDATE atomique ; RETURNING donne les compteurs réellement écrits (workers concurrents)
+        after = db.session.execute(
+            db.update(UserStats)
+            .where(UserStats.user_id == history.user_id)
+            .values(
+                games=UserStats.games + 1,
+                wins=UserStats.wins + (1 if won else 0),
+                losses=UserStats.losses + (1 if history.result == 'lose' else 0),
+                wagered=UserStats.wagered + history.bet_amount,
+                winnings=UserStats.winnings + max(profit, 0),
+                win_streak=UserStats.win_streak + 1 if won else 0,
+                best_multiplier=db.case((UserStats.best_multiplier < multiplier, multiplier),
+                                        else_=UserStats.best_multiplier),
+                peak_balance=db.case((UserStats.peak_balance < balance, balance),
+                                     else_=UserStats.peak_balance),
+                biggest_win=db.case((UserStats.biggest_win < profit, profit),
+                                    else_=UserStats.biggest_win),
+            )
+            .returning(UserStats.games, UserStats.wins, UserStats.win_streak,
+                       UserStats.best_multiplier, UserStats.peak_balance, UserStats.biggest_win),
+            execution_options={'synchronize_session': False}
+        ).one()
+        db.session.expire(summary)
+        
+        return before, dict(zip(UserStats.COUNTERS, after))
+    
+    @staticmethod
+    def aggregate_query():
+        """Agrégat SQL groupé par joueur"""
+        return db.session.query(
+            GameHistory.user_id,
+            db.func.count(GameHistory.id),
+            db.func.sum(db.case((GameHistory.result == 'win', 1), else_=0)),
+            db.func.sum(db.case((GameHistory.result == 'lose', 1), else_=0)),
+            db.func.sum(GameHistory.bet_amount),
+            db.func.sum(db.case((GameHistory.profit > 0, GameHistory.profit), else_=0)),
+            db.func.max(db.case((GameHistory.result == 'win', GameHistory.multiplier), else_=0)),
+            db.func.max(db.case((GameHistory.profit > 0, GameHistory.profit), else_=0)),
+        ).group_by(GameHistory.user_id)
+    
+    @staticmethod
+    def streak_query():
+        """Série de victoires en cours par joueur : victoires après la dernière partie non gagnée"""
+        last_miss = db.session.query(
+            GameHistory.user_id.label('user_id'),
+            db.func.max(GameHistory.id).label('last_id')
+        ).filter(GameHistory.result != 'win').group_by(GameHistory.user_id).subquery()
+        
+        return db.session.query(GameHistory.user_id, db.func.count(GameHistory.id)) \
+            .outerjoin(last_miss, last_miss.c.user_id == GameHistory.user_id) \
+            .filter(GameHistory.result == 'win', GameHistory.id > db.func.coalesce(last_miss.c.last_id, 0)) \
+            .group_by(GameHistory.user_id)
+    
+    @staticmethod
+    def from_row(user_id, games=0, wins=0, losses=0, wagered=0, winnings=0, best_multiplier=0,
+                 biggest_win=0, win_streak=0, peak_balance=0):
+        return UserStats(user_id=user_id, games=games or 0, wins=wins or 0, losses=losses or 0,
+                         wagered=wagered or 0, winnings=winnings or 0, best_multiplier=best_multiplier or 0,
+                         biggest_win=biggest_win or 0, win_streak=win_streak or 0,
+                         peak_balance=peak_balance or 0)
+    
+    @staticmethod
+    def from_history(user_id, balance=0):
+        """Résumé calculé par agrégat SQL (non ajouté à la session)"""
+        row = UserStats.aggregate_query().filter(GameHistory.user_id == user_id).first()
+        streak = UserStats.streak_query().filter(GameHistory.user_id == user_id).first()
+        return UserStats.from_row(user_id, *(row[1:] if row else ()),
+                                  win_streak=streak[1] if streak else 0, peak_balance=balance)
+    
+    @staticmethod
+    def rebuild():
+        """Recalcule le résumé de tous les joueurs depuis l'historique"""
+        rows = UserStats.aggregate_query().all()
+        streaks = dict(UserStats.streak_query().all())
+        balances = dict(db.session.query(User.id, User.money).all())
+        
+        UserStats.query.delete()
+        db.session.add_all(UserStats.from_row(*row, win_streak=streaks.get(row[0], 0),
+                                              peak_balance=balances.get(row[0], 0))
+                           for row in rows)
+        db.session.commit()
+        UserStats.cache.clear()
+        return len(rows)
+    
+    def to_dict(self):
+        return {
+            'total_games': self.games,
+            'total_wins': self.wins,
+            'total_losses': self.losses,
+            'win_rate': round((self.wins / self.games * 100), 1) if self.games > 0 else 0,
+            'total_wagered': self.wagered,
+            'total_winnings': self.winnings,
+            'net_profit': self.winnings - self.wagered
+        }
+    
+    def __repr__(self):
+        return f'<UserStats user_id={self.user_id} games={self.games}>'
+
+
+class WeeklyProfit(db.Model):
+    """Profit cumulé par joueur et par semaine (classement de la semaine)"""
+    __tablename__ = 'weekly_profits'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    week_start = db.Column(db.Date, primary_key=True)  # Lundi (UTC)
+    profit = db.Column(db.Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_weekly_profits_week_profit', 'week_start', 'profit'),
+    )
+    
+    @staticmethod
+    def week_of(day):
+        return day - timedelta(days=day.weekday())
+    
+    @staticmethod
+    def record(user_id, week_start, profit):
+        """Ajoute le profit d'une partie à la semaine (UPDATE puis INSERT si absent) ; renvoie le cumul"""
+        total = db.session.execute(
+            db.update(WeeklyProfit)
+            .where(WeeklyProfit.user_id == user_id, WeeklyProfit.week_start == week_start)
+            .values(profit=WeeklyProfit.profit + profit)
+            .returning(WeeklyProfit.profit),
+            execution_options={'synchronize_session': False}
+        ).scalar()
+        
+        if total is None:
+            if insert_ignore(WeeklyProfit.__table__, user_id=user_id, week_start=week_start, profit=profit):
+                return profit
+            return WeeklyProfit.record(user_id, week_start, profit)
+        return total
+    
+    @staticmethod
+    def rebuild(week_start):
+        """Recalcule les profits de la semaine depuis l'historique"""
+        rows = db.session.query(GameHistory.user_id, db.func.sum(GameHistory.profit)) \
+            .filter(GameHistory.played_at >= datetime.combine(week_start, datetime.min.time())) \
+            .group_by(GameHistory.user_id).all()
+        
+        WeeklyProfit.query.filter_by(week_start=week_start).delete()
+        db.session.add_all(WeeklyProfit(user_id=user_id, week_start=week_start, profit=profit or 0)
+                           for user_id, profit in rows)
+        db.session.commit()
+        return len(rows)
+    
+    def __repr__(self):
+        return f'<WeeklyProfit user_id={self.user_id} week={self.week_start} profit={self.profit}>'
+
+
+class GameState(db.Model):
+    """Parties en cours (backend SQL du store de parties, voir game_state.py)"""
+    __tablename__ = 'game_states'
+    
+    id = db.Column(db.String(64), primary_key=True)  # <jeu>:<jeton opaque>
+    data = db.Column(db.JSON, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f'<GameState {self.id}>'
+
+
 class Achievement(db.Model):
     """Succès débloquables"""
     __tablename__ = 'achievements'
@@ -157,14 +670,26 @@ class GlobalStats(db.Model):
     
     @staticmethod
     def increment(key, value=1):
-        """Incrémente une stat globale"""
-        stat = GlobalStats.query.filter_by(stat_key=key).first()
-        if not stat:
-            stat = GlobalStats(stat_key=key, stat_value=value)
-            db.session.add(stat)
-        else:
-            stat.stat_value += value
-        db.session.commit()
+        """Incrémente une stat globale en une requête atomique (upsert, sans commit)"""
+        now = datetime.utcnow()
+        insert = _upsert_insert()
+        if insert is not None:
+            statement = insert(GlobalStats).values(stat_key=key, stat_value=value, last_updated=now)
+            db.session.execute(statement.on_conflict_do_update(
+                index_elements=[GlobalStats.stat_key],
+                set_={'stat_value': GlobalStats.stat_value + statement.excluded.stat_value, 'last_updated': now}
+            ))
+            return
+        
+        # Autres bases : UPDATE atomique, INSERT si la clé n'existe pas encore
+        while True:
+            updated = db.session.execute(
+                db.update(GlobalStats).where(GlobalStats.stat_key == key)
+                .values(stat_value=GlobalStats.stat_value + value, last_updated=now),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            if updated or insert_ignore(GlobalStats.__table__, stat_key=key, stat_value=value, last_updated=now):
+                return
     
     @staticmethod
     def get_value(key, default=0):
@@ -191,4 +716,97 @@ class DailyBonus(db.Model):
     )
     
     def __repr__(self):
-        return f'<DailyBonus user_id={self.user_id} date={self.claimed_date}>'
\ No newline at end of file
+        return f'<DailyBonus user_id={self.user_id} date={self.claimed_date}>'
+
+class FairSeed(db.Model):
+    """Graines du tirage vérifiable (rng.py) : une par rotation, la plus récente est active"""
+    __tablename__ = 'fair_seeds'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    rotation = db.Column(db.Integer, nullable=False)
+    server_seed = db.Column(db.String(64), nullable=False)  # Secrète tant que revealed est faux
+    server_seed_hash = db.Column(db.String(64), nullable=False)  # SHA-256, publiée d'avance
+    client_seed = db.Column(db.String(64), nullable=False)
+    # Graine de la rotation suivante, tirée et publiée (hachée) avant le choix de la graine client
+    next_server_seed = db.Column(db.String(64))
+    next_server_seed_hash = db.Column(db.String(64))
+    nonce = db.Column(db.Integer, default=0, nullable=False)  # Parties tirées avec cette graine
+    revealed = db.Column(db.Boolean, default=False, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'rotation', name='unique_fair_seed_rotation'),
+    )
+    
+    def to_dict(self):
+        return {
+            'rotation': self.rotation,
+            'server_seed': self.server_seed if self.revealed else None,
+            'server_seed_hash': self.server_seed_hash,
+            'client_seed': self.client_seed,
+            'nonce': self.nonce,
+            'next_server_seed_hash': None if self.revealed else self.next_server_seed_hash,
+        }
+    
+    def __repr__(self):
+        return f'<FairSeed user_id={self.user_id} rotation={self.rotation}>'
+
+
+class GameRollup(db.Model):
+    """Agrégats de l'historique par heure ou par jour et par jeu (rollups.py)"""
+    __tablename__ = 'game_rollups'
+    
+    period = db.Column(db.String(4), primary_key=True)  # 'hour' ou 'day'
+    bucket_start = db.Column(db.DateTime, primary_key=True)  # Début de la tranche (UTC)
+    game_type = db.Column(db.String(20), primary_key=True)
+    
+    games = db.Column(db.Integer, default=0, nullable=False)
+    wins = db.Column(db.Integer, default=0, nullable=False)
+    losses = db.Column(db.Integer, default=0, nullable=False)
+    wagered = db.Column(db.BigInteger, default=0, nullable=False)
+    paid_out = db.Column(db.BigInteger, default=0, nullable=False)  # Mises rendues, gains compris
+    players = db.Column(db.Integer, default=0, nullable=False)  # Joueurs distincts (RollupPlayer)
+    min_multiplier = db.Column(db.Float)
+    max_multiplier = db.Column(db.Float)
+    
+    def to_dict(self):
+        return {
+            'period': self.period,
+            'bucket_start': self.bucket_start.isoformat(),
+            'game_type': self.game_type,
+            'games': self.games,
+            'wins': self.wins,
+            'losses': self.losses,
+            'wagered': self.wagered,
+            'paid_out': self.paid_out,
+            'rtp': round(self.paid_out / self.wagered, 4) if self.wagered else None,
+            'players': self.players,
+            'min_multiplier': self.min_multiplier,
+            'max_multiplier': self.max_multiplier,
+        }
+    
+    def __repr__(self):
+        return f'<GameRollup {self.period} {self.bucket_start} {self.game_type}>'
+
+
+class RollupPlayer(db.Model):
+    """Joueurs déjà comptés dans une tranche (les distincts ne s'additionnent pas)"""
+    __tablename__ = 'rollup_players'
+    
+    period = db.Column(db.String(4), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    game_type = db.Column(db.String(20), primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+
+
+class RollupWatermark(db.Model):
+    """Dernier GameHistory.id agrégé, par pipeline"""
+    __tablename__ = 'rollup_watermarks'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RollupWatermark {self.name}={self.last_id}>'
@@ -0,0 +1,108 @@
+"""Hachage des mots de passe hors du thread de requête
+
+scrypt/PBKDF2 occupe le CPU plusieurs dizaines de millisecondes : lors d'une
+vague de connexions, les workers gunicorn (sync) ne servent plus les parties.
+Les calculs partent dans un petit pool de processus par worker
+(PASSWORD_HASH_WORKERS, 0 = dans le thread courant). Au-delà de
+PASSWORD_HASH_MAX_PENDING calculs en attente, la requête est refusée tout de
+suite (HashingBusy -> 503 + Retry-After) au lieu de faire la queue.
+
+Les hachages dont la méthode ou les paramètres ne correspondent plus à
+PASSWORD_HASH_METHOD sont refaits à la connexion suivante (needs_rehash).
+"""
+import os
+import threading
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+
+def method_prefix(method):
+    """Préfixe 'méthode:paramètres' que werkzeug écrit pour cette méthode (défauts complétés, sans hacher)"""
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        args = [str(2 ** 15), '8', '1']
+    elif name == 'pbkdf2' and len(args) < 2:
+        args = [args[0] if args else 'sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    return ':'.join([name, *args])
+
+
+class HashingBusy(RuntimeError):
+    """Pool de hachage saturé : la requête est rejetée plutôt que mise en attente"""
+
+
+class PasswordHasher:
+    """Pool de processus borné pour generate/check_password_hash"""
+    
+    def __init__(self, method='scrypt', workers=0, max_pending=8, timeout=10):
+        self.configure(method, workers, max_pending, timeout)
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def configure(self, method, workers, max_pending, timeout):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._prefix = method_prefix(method)
+    
+    def _executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Importés au premier hachage : le démarrage du worker ne les charge pas
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    
+                    # forkserver : le worker a déjà des threads (pool d'entropie, écriture différée, SSE...),
+                    # un fork direct pourrait hériter d'un verrou tenu par l'un d'eux et bloquer le processus fils.
+                    # Comme spawn, le fils réimporte le script principal (gunicorn, flask : protégés par __main__)
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    context = multiprocessing.get_context(method)
+                    if method == 'forkserver':
+                        context.set_forkserver_preload(['werkzeug.security'])
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+                    self._pid = os.getpid()
+        return self._pool
+    
+    def _run(self, function, *args):
+        if self.workers <= 0:
+            return function(*args)
+        from concurrent.futures import TimeoutError as FutureTimeout
+        
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingBusy("Trop de connexions en cours, réessaie dans un instant")
+        try:
+            future = self._executor().submit(function, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # Le créneau est rendu à la fin (ou à l'annulation) du calcul, pas quand la requête abandonne :
+        # un calcul encore dans la file du pool compte toujours dans PASSWORD_HASH_MAX_PENDING
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise HashingBusy("Hachage trop lent, réessaie dans un instant") from None
+    
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+    
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        """Vrai si le hachage a été fait avec une autre méthode ou d'autres paramètres de coût"""
+        return password_hash.split('$', 1)[0] != self._prefix
+    
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._pid = None
+
+
+hasher = PasswordHasher()
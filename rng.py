@@ -0,0 +1,322 @@
+"""Générateur des tirages de jeu : pool CSPRNG ou tirage vérifiable (provably fair)
+
+Mode 'pool' (RNG_MODE) : les mots de 32 bits viennent d'os.urandom, par blocs
+de RNG_POOL_BYTES octets. Un thread du worker prépare le bloc suivant pendant
+que le courant est consommé : un tirage se réduit à un array.pop(). Le pool
+est vidé dans l'enfant après un fork, les workers ne partagent aucun octet.
+
+Mode 'fair' : une partie est tirée de HMAC-SHA256(graine serveur,
+"<graine client>:<nonce>:<bloc>") pour bloc = 0, 1, 2... ; chaque condensé
+donne 8 mots de 32 bits (big-endian) consommés dans l'ordre. Seul le SHA-256
+de la graine serveur est publié ; la graine est révélée à la rotation
+(POST /api/fair/rotate) et chaque partie jouée avec elle peut alors être
+rejouée (POST /api/fair/verify, ou toute implémentation de HMAC). Le hachage
+de la graine suivante est publié en même temps que l'active : le joueur
+choisit sa nouvelle graine client en le connaissant déjà. Une partie en
+plusieurs coups (blackjack, minebomb) encore ouverte quand sa graine est
+révélée est perdue : elle ne peut plus être jouée.
+
+Tirages à partir des mots, identiques dans les deux modes :
+    randbelow(n)  mot suivant tant que mot >= 2**32 - 2**32 % n ; résultat mot % n
+    shuffle(x)    Fisher-Yates, i de len(x) - 1 à 1, échange x[i] et x[randbelow(i + 1)]
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+import threading
+from array import array
+from datetime import datetime
+
+from cards import cards_to_json
+from games import draw_roulette, draw_slots, draw_minebomb, draw_blackjack
+from models import db, FairSeed, insert_ignore
+
+WORD = 'I' if array('I').itemsize == 4 else 'L'
+WORD_RANGE = 1 << 32
+CLIENT_SEED_MAX_LENGTH = 64
+
+
+class Draws:
+    """randint / choice / shuffle à partir de mots de 32 bits uniformes (self._next)"""
+    
+    def randbelow(self, n):
+        if not 0 < n <= WORD_RANGE:
+            raise ValueError(f"Borne hors de 1..2**32 : {n}")
+        limit = WORD_RANGE - WORD_RANGE % n
+        next_word = self._next
+        word = next_word()
+        while word >= limit:
+            word = next_word()
+        return word % n
+    
+    def randint(self, a, b):
+        return a + self.randbelow(b - a + 1)
+    
+    def choice(self, seq):
+        return seq[self.randbelow(len(seq))]
+    
+    def shuffle(self, x):
+        randbelow = self.randbelow
+        for i in range(len(x) - 1, 0, -1):
+            j = randbelow(i + 1)
+            x[i], x[j] = x[j], x[i]
+
+
+class EntropyPool(Draws):
+    """Mots d'os.urandom tirés par blocs ; le bloc suivant est préparé hors requête"""
+    
+    def __init__(self, size=65536):
+        self.size = size
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+    
+    def _reset(self):
+        self._words = array(WORD)
+        self._spare = None
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+    
+    def _fill(self):
+        words = array(WORD)
+        words.frombytes(os.urandom(self.size - self.size % 4))
+        return words
+    
+    def _next(self):
+        try:
+            return self._words.pop()
+        except IndexError:
+            return self._refill()
+    
+    # randbelow et shuffle recopiés sans appel de méthode par mot : le tirage reste moins cher que random
+    def randbelow(self, n):
+        if not 0 < n <= WORD_RANGE:
+            raise ValueError(f"Borne hors de 1..2**32 : {n}")
+        limit = WORD_RANGE - WORD_RANGE % n
+        try:
+            word = self._words.pop()
+        except IndexError:
+            word = self._refill()
+        while word >= limit:
+            word = self._next()
+        return word % n
+    
+    def randint(self, a, b):
+        return a + self.randbelow(b - a + 1)
+    
+    def choice(self, seq):
+        if not seq:
+            raise IndexError("Séquence vide")
+        n = len(seq)
+        limit = WORD_RANGE - WORD_RANGE % n
+        try:
+            word = self._words.pop()
+        except IndexError:
+            word = self._refill()
+        while word >= limit:
+            word = self._next()
+        return seq[word % n]
+    
+    def shuffle(self, x):
+        pop = self._words.pop
+        for i in range(len(x) - 1, 0, -1):
+            n = i + 1
+            limit = WORD_RANGE - WORD_RANGE % n
+            try:
+                word = pop()
+            except IndexError:
+                word = self._refill()
+                pop = self._words.pop
+            while word >= limit:
+                word = self._next()
+            j = word % n
+            x[i], x[j] = x[j], x[i]
+    
+    def _refill(self):
+        """Bloc épuisé : bascule sur celui préparé par le thread (tiré sur place s'il manque)"""
+        with self._lock:
+            while True:
+                if not self._words:
+                    self._words = self._spare or self._fill()
+                    self._spare = None
+                    self._start()
+                    self._wanted.set()
+                try:
+                    return self._words.pop()
+                except IndexError:
+                    continue
+    
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(self._wanted,),
+                                            name='entropy-pool', daemon=True)
+            self._thread.start()
+    
+    def _run(self, wanted):
+        while True:
+            wanted.wait()
+            wanted.clear()
+            spare = self._fill()
+            with self._lock:
+                if self._spare is None:
+                    self._spare = spare
+
+
+class FairRandom(Draws):
+    """Mots tirés de HMAC-SHA256(graine serveur, "<graine client>:<nonce>:<bloc>")"""
+    
+    def __init__(self, server_seed, client_seed, nonce):
+        self._key = server_seed.encode()
+        self._prefix = f'{client_seed}:{nonce}:'
+        self._block = 0
+        self._words = []
+    
+    def _next(self):
+        if not self._words:
+            digest = hmac.new(self._key, f'{self._prefix}{self._block}'.encode(), hashlib.sha256).digest()
+            self._block += 1
+            self._words = list(reversed(struct.unpack('>8I', digest)))
+        return self._words.pop()
+
+
+def seed_hash(server_seed):
+    return hashlib.sha256(server_seed.encode()).hexdigest()
+
+
+def _create_seed(user_id, rotation, client_seed=None, server_seed=None):
+    """Nouvelle graine serveur et sa suivante (INSERT ignoré si la rotation existe déjà)"""
+    server_seed = server_seed or secrets.token_hex(32)
+    next_server_seed = secrets.token_hex(32)
+    return insert_ignore(FairSeed.__table__, user_id=user_id, rotation=rotation,
+                         server_seed=server_seed, server_seed_hash=seed_hash(server_seed),
+                         client_seed=client_seed or secrets.token_hex(8),
+                         next_server_seed=next_server_seed, next_server_seed_hash=seed_hash(next_server_seed),
+                         nonce=0, revealed=False, created_at=datetime.utcnow())
+
+
+def active_seed(user_id):
+    """Graine non révélée du joueur, créée au premier appel (sans commit)"""
+    seed = FairSeed.query.filter_by(user_id=user_id, revealed=False).first()
+    if seed is None:
+        _create_seed(user_id, 0)
+        seed = FairSeed.query.filter_by(user_id=user_id, revealed=False).one()
+    elif seed.next_server_seed is None:
+        # Graine créée avant l'engagement sur la suivante : la suivante est tirée maintenant
+        next_server_seed = secrets.token_hex(32)
+        FairSeed.query.filter_by(id=seed.id, next_server_seed=None).update({
+            FairSeed.next_server_seed: next_server_seed,
+            FairSeed.next_server_seed_hash: seed_hash(next_server_seed),
+        }, synchronize_session=False)
+        db.session.refresh(seed)
+    return seed
+
+
+def revealed_seeds(user_id, limit=10):
+    return FairSeed.query.filter_by(user_id=user_id, revealed=True) \
+        .order_by(FairSeed.rotation.desc()).limit(limit).all()
+
+
+def rotate(user_id, client_seed=None, next_server_seed_hash=None):
+    """Révèle la graine active ; la graine suivante, déjà publiée, devient active (nonce 0)
+
+    La nouvelle graine serveur est celle dont le hachage était publié avant la
+    rotation (next_server_seed_hash) : elle ne peut pas avoir été choisie en
+    fonction de la graine client reçue ici. Rien n'est révélé (None) si le
+    joueur choisit sa graine client alors qu'aucune graine suivante n'était
+    encore publiée, ou si next_server_seed_hash est fourni et ne correspond pas.
+    """
+    # Lu avant active_seed(), qui complète et recharge le même objet (map d'identité de la session)
+    published = FairSeed.query.filter_by(user_id=user_id, revealed=False).first()
+    had_published_next = published is not None and published.next_server_seed is not None
+    active = active_seed(user_id)
+    if client_seed is not None and not had_published_next:
+        return None
+    if next_server_seed_hash is not None and next_server_seed_hash != active.next_server_seed_hash:
+        return None
+    
+    revealed = db.session.execute(
+        db.update(FairSeed)
+        .where(FairSeed.id == active.id, FairSeed.revealed.is_(False))
+        .values(revealed=True)
+        .returning(FairSeed.id),
+        execution_options={'synchronize_session': False}
+    ).scalar()
+    if revealed is None:
+        return None
+    
+    seed = db.session.get(FairSeed, revealed, populate_existing=True)
+    _create_seed(user_id, seed.rotation + 1, client_seed, seed.next_server_seed)
+    return seed
+
+
+def is_revealed(user_id, proof):
+    """Vrai si la graine d'une partie en cours (sa preuve) a été révélée depuis son tirage"""
+    return not db.session.query(
+        FairSeed.query.filter_by(user_id=user_id, server_seed_hash=proof['server_seed_hash'], revealed=False).exists()
+    ).scalar()
+
+
+def reserve_nonce(user_id):
+    """Prend le nonce suivant de la graine active (UPDATE gardé par revealed, sans commit)
+
+    Une rotation concurrente verrouille la même ligne : une partie ne peut pas
+    être tirée avec une graine déjà révélée.
+    """
+    while True:
+        row = db.session.execute(
+            db.update(FairSeed)
+            .where(FairSeed.user_id == user_id, FairSeed.revealed.is_(False))
+            .values(nonce=FairSeed.nonce + 1)
+            .returning(FairSeed.server_seed, FairSeed.server_seed_hash, FairSeed.client_seed, FairSeed.nonce),
+            execution_options={'synchronize_session': False}
+        ).first()
+        if row is not None:
+            return row.server_seed, row.server_seed_hash, row.client_seed, row.nonce - 1
+        _create_seed(user_id, 0)
+
+
+def verify(server_seed, client_seed, nonce, game, bombs=None):
+    """Rejoue le tirage d'une partie à partir de graines révélées"""
+    rng = FairRandom(server_seed, client_seed, nonce)
+    outcome = {'game': game, 'server_seed_hash': seed_hash(server_seed), 'client_seed': client_seed,
+               'nonce': nonce}
+    if game == 'roulette':
+        outcome['number'] = draw_roulette(rng)
+    elif game == 'slots':
+        outcome['reels'] = draw_slots(rng)
+    elif game == 'minebomb':
+        outcome['grid'] = draw_minebomb(rng, bombs)
+    elif game == 'blackjack':
+        num_decks, shoe = draw_blackjack(rng)
+        outcome['num_decks'] = num_decks
+        outcome['draw_order'] = cards_to_json(reversed(shoe))
+    else:
+        raise ValueError(f"Jeu inconnu : {game}")
+    return outcome
+
+
+class RandomService:
+    """Générateur des parties selon RNG_MODE ('pool' ou 'fair')"""
+    
+    def __init__(self):
+        self.mode = 'pool'
+        self.pool = EntropyPool()
+    
+    def init_app(self, app):
+        self.mode = app.config.get('RNG_MODE', 'pool')
+        if self.mode not in ('pool', 'fair'):
+            raise ValueError(f"RNG_MODE inconnu : {self.mode}")
+        self.pool.size = app.config.get('RNG_POOL_BYTES', 65536)
+    
+    def for_bet(self, user_id):
+        """Générateur d'une partie et sa preuve (None en mode pool) ; réserve un nonce sans commit"""
+        if self.mode != 'fair':
+            return self.pool, None
+        server_seed, server_seed_hash, client_seed, nonce = reserve_nonce(user_id)
+        proof = {'server_seed_hash': server_seed_hash, 'client_seed': client_seed, 'nonce': nonce}
+        return FairRandom(server_seed, client_seed, nonce), proof
+
+
+service = RandomService()
@@ -0,0 +1,187 @@
+"""Agrégats horaires et journaliers de l'historique des parties (analytics)
+
+Les tableaux de bord lisent game_rollups, jamais game_history : une ligne par
+tranche (heure ou jour UTC) et par jeu, plus une ligne 'all' tous jeux
+confondus, avec parties, gains, pertes, misé, rendu, joueurs distincts et
+multiplicateurs min/max.
+
+run() reprend après le dernier GameHistory.id agrégé (RollupWatermark) et
+lit l'historique par lots d'id croissants, sans la colonne details. Chaque
+lot est une transaction : agrégats, joueurs distincts (RollupPlayer, les
+distincts ne s'additionnant pas) et avancée du repère. Le repère avance par
+compare-and-set : deux exécutions simultanées ne comptent jamais un lot deux
+fois. Les parties de moins de ROLLUP_LAG_SECONDS sont laissées au passage
+suivant : une transaction (ou un lot du write-behind) qui a obtenu un id plus
+petit a ce délai pour être commitée avant que le repère ne la dépasse.
+
+À lancer périodiquement (cron) : flask --app app rollup-history.
+"""
+from datetime import datetime, timedelta
+
+from models import db, insert_ignore, insert_ignore_many, GameHistory, GameRollup, RollupPlayer, RollupWatermark
+
+WATERMARK = 'game_history'
+ALL_GAMES = 'all'
+
+PERIODS = {
+    'hour': lambda moment: moment.replace(minute=0, second=0, microsecond=0),
+    'day': lambda moment: moment.replace(hour=0, minute=0, second=0, microsecond=0),
+}
+
+# Colonnes lues dans l'historique (details, le JSON volumineux, n'est jamais lu)
+COLUMNS = (GameHistory.id, GameHistory.user_id, GameHistory.game_type, GameHistory.bet_amount,
+           GameHistory.result, GameHistory.profit, GameHistory.multiplier, GameHistory.played_at)
+
+
+class _Bucket:
+    """Agrégat en mémoire d'une tranche pour un lot"""
+    __slots__ = ('games', 'wins', 'losses', 'wagered', 'paid_out', 'min_multiplier', 'max_multiplier')
+    
+    def __init__(self):
+        self.games = self.wins = self.losses = self.wagered = self.paid_out = 0
+        self.min_multiplier = self.max_multiplier = None
+    
+    def add(self, row):
+        self.games += 1
+        self.wins += row.result == 'win'
+        self.losses += row.result == 'lose'
+        self.wagered += row.bet_amount
+        self.paid_out += max(row.bet_amount + (row.profit or 0), 0)
+        if row.multiplier is not None:
+            if self.min_multiplier is None or row.multiplier < self.min_multiplier:
+                self.min_multiplier = row.multiplier
+            if self.max_multiplier is None or row.multiplier > self.max_multiplier:
+                self.max_multiplier = row.multiplier
+
+
+def watermark():
+    """Dernier id agrégé (0 avant le premier passage ; lecture seule)"""
+    return db.session.query(RollupWatermark.last_id).filter_by(name=WATERMARK).scalar() or 0
+
+
+def _merge(key, bucket):
+    """Ajoute un agrégat de lot à sa ligne (UPDATE atomique, INSERT au premier lot de la tranche)"""
+    period, bucket_start, game_type = key
+    values = {
+        GameRollup.games: GameRollup.games + bucket.games,
+        GameRollup.wins: GameRollup.wins + bucket.wins,
+        GameRollup.losses: GameRollup.losses + bucket.losses,
+        GameRollup.wagered: GameRollup.wagered + bucket.wagered,
+        GameRollup.paid_out: GameRollup.paid_out + bucket.paid_out,
+    }
+    if bucket.min_multiplier is not None:
+        values[GameRollup.min_multiplier] = db.case(
+            (GameRollup.min_multiplier.is_(None) | (GameRollup.min_multiplier > bucket.min_multiplier),
+             bucket.min_multiplier), else_=GameRollup.min_multiplier)
+        values[GameRollup.max_multiplier] = db.case(
+            (GameRollup.max_multiplier.is_(None) | (GameRollup.max_multiplier < bucket.max_multiplier),
+             bucket.max_multiplier), else_=GameRollup.max_multiplier)
+    
+    query = GameRollup.query.filter_by(period=period, bucket_start=bucket_start, game_type=game_type)
+    if query.update(values, synchronize_session=False):
+        return
+    inserted = insert_ignore(GameRollup.__table__, period=period, bucket_start=bucket_start, game_type=game_type,
+                             games=bucket.games, wins=bucket.wins, losses=bucket.losses, wagered=bucket.wagered,
+                             paid_out=bucket.paid_out, players=0, min_multiplier=bucket.min_multiplier,
+                             max_multiplier=bucket.max_multiplier)
+    if not inserted:
+        # Ligne créée entre-temps par une autre exécution
+        query.update(values, synchronize_session=False)
+
+
+def _count_players(keys):
+    """Recompte les joueurs distincts des tranches touchées par le lot (une requête groupée)"""
+    counts = db.session.query(
+        RollupPlayer.period, RollupPlayer.bucket_start, RollupPlayer.game_type, db.func.count()
+    ).filter(
+        RollupPlayer.bucket_start.in_({bucket_start for _, bucket_start, _ in keys})
+    ).group_by(RollupPlayer.period, RollupPlayer.bucket_start, RollupPlayer.game_type).all()
+    
+    for period, bucket_start, game_type, players in counts:
+        if (period, bucket_start, game_type) in keys:
+            GameRollup.query.filter_by(period=period, bucket_start=bucket_start, game_type=game_type).update(
+                {GameRollup.players: players}, synchronize_session=False)
+
+
+def run_batch(batch_size=5000, lag=60):
+    """Agrège le lot suivant et le commite ; renvoie le nombre de parties agrégées (0 : à jour)"""
+    last_id = watermark()
+    cutoff = datetime.utcnow() - timedelta(seconds=lag)
+    rows = db.session.query(*COLUMNS).filter(GameHistory.id > last_id).order_by(GameHistory.id).limit(batch_size).all()
+    
+    # Arrêt à la première partie trop récente : le repère ne dépasse jamais une partie ignorée
+    ready = []
+    for row in rows:
+        if row.played_at is None or row.played_at > cutoff:
+            break
+        ready.append(row)
+    if not ready:
+        return 0
+    
+    buckets = {}
+    players = set()
+    for row in ready:
+        for period, truncate in PERIODS.items():
+            bucket_start = truncate(row.played_at)
+            for game_type in (row.game_type, ALL_GAMES):
+                key = (period, bucket_start, game_type)
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = _Bucket()
+                bucket.add(row)
+                players.add(key + (row.user_id,))
+    
+    # Compare-and-set en tête de transaction : la ligne du repère reste verrouillée jusqu'au commit,
+    # une exécution concurrente qui a lu le même repère trouve 0 ligne et abandonne son lot
+    advanced = RollupWatermark.query.filter_by(name=WATERMARK, last_id=last_id).update({
+        RollupWatermark.last_id: ready[-1].id,
+        RollupWatermark.updated_at: datetime.utcnow(),
+    }, synchronize_session=False)
+    if not advanced:
+        db.session.rollback()
+        return 0
+    
+    for key, bucket in buckets.items():
+        _merge(key, bucket)
+    insert_ignore_many(RollupPlayer.__table__, [
+        {'period': period, 'bucket_start': bucket_start, 'game_type': game_type, 'user_id': user_id}
+        for period, bucket_start, game_type, user_id in players
+    ])
+    _count_players(set(buckets))
+    db.session.commit()
+    return len(ready)
+
+
+def run(batch_size=5000, lag=60):
+    """Agrège tout l'historique en attente, lot par lot ; renvoie le nombre de parties agrégées"""
+    # Ligne du repère créée au premier passage (le compare-and-set de run_batch la suppose présente)
+    insert_ignore(RollupWatermark.__table__, name=WATERMARK, last_id=0, updated_at=datetime.utcnow())
+    db.session.commit()
+    
+    total = 0
+    while True:
+        count = run_batch(batch_size, lag)
+        if not count:
+            return total
+        total += count
+
+
+def reset():
+    """Vide les agrégats et remet le repère à zéro (avant un recalcul complet)"""
+    RollupPlayer.query.delete(synchronize_session=False)
+    GameRollup.query.delete(synchronize_session=False)
+    RollupWatermark.query.filter_by(name=WATERMARK).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def query(period, start=None, end=None, game_type=None, limit=5000):
+    """Agrégats d'une période entre start (inclus) et end (exclu), par tranche puis par jeu"""
+    rows = GameRollup.query.filter_by(period=period)
+    if start is not None:
+        rows = rows.filter(GameRollup.bucket_start >= start)
+    if end is not None:
+        rows = rows.filter(GameRollup.bucket_start < end)
+    if game_type is not None:
+        rows = rows.filter_by(game_type=game_type)
+    rows = rows.order_by(GameRollup.bucket_start, GameRollup.game_type).limit(limit)
+    return [rollup.to_dict() for rollup in rows]
@@ -0,0 +1,219 @@
+"""Simulateur Monte Carlo du RTP des quatre jeux (NumPy vectorisé, multi-processus)
+
+Les règles viennent de games.py : les tables de paiement vectorisées sont
+construites en appelant les fonctions pures, le simulateur ne peut donc pas
+diverger des routes.
+
+Usage :
+    python simulator.py slots --rounds 10000000 --seed 42
+    python simulator.py roulette --mode number --choice 17
+    python simulator.py minebomb --bombs 5 --diamonds 3
+    python simulator.py blackjack --stand-on 17 --workers 8
+    python simulator.py all --json
+
+API :
+    from simulator import simulate
+    simulate('slots', rounds=1_000_000, seed=42)
+
+Le résultat est reproductible pour une même graine et une même taille de lot,
+quel que soit le nombre de processus. Nécessite NumPy (requirements-dev.txt).
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from games import (roulette_multiplier, SLOT_SYMBOLS, slots_multiplier, MINEBOMB_CELLS,
+                   minebomb_multiplier, DEALER_STANDS_ON, blackjack_result, BLACKJACK_PAYOUTS)
+
+GAMES = ('blackjack', 'roulette', 'minebomb', 'slots')
+
+DEFAULT_BATCH_SIZE = 100_000
+
+
+# ============================================
+# LOTS VECTORISÉS (retour par unité misée, 0 = mise perdue)
+# ============================================
+
+def _roulette_batch(rng, n, mode='color', choice='Red', **_):
+    table = np.array([roulette_multiplier(mode, choice, number) for number in range(37)], dtype=np.float64)
+    return table[rng.integers(0, 37, n)]
+
+
+def _slots_batch(rng, n, **_):
+    size = len(SLOT_SYMBOLS)
+    table = np.array([slots_multiplier(reels) for reels in product(SLOT_SYMBOLS, repeat=3)], dtype=np.float64)
+    reels = rng.integers(0, size, (n, 3))
+    return table[reels[:, 0] * size * size + reels[:, 1] * size + reels[:, 2]]
+
+
+def _minebomb_batch(rng, n, bombs=5, diamonds=3, bet=100, **_):
+    """Stratégie : révéler `diamonds` cases puis encaisser"""
+    # Nombre de bombes parmi les cases révélées (tirage sans remise)
+    hit = rng.hypergeometric(bombs, MINEBOMB_CELLS - bombs, diamonds, n) if diamonds else np.zeros(n)
+    payout = int(bet * minebomb_multiplier(diamonds, bombs)) / bet
+    return np.where(hit == 0, payout, 0.0)
+
+
+# Cartes par valeur : as (11), 2 à 9, puis les quatre figures/10 (valeur 10)
+_CARD_VALUES = np.array([11, 2, 3, 4, 5, 6, 7, 8, 9, 10], dtype=np.int64)
+_CARDS_PER_DECK = np.array([4, 4, 4, 4, 4, 4, 4, 4, 4, 16], dtype=np.int64)
+_CARDS_PER_ROUND = 24
+
+
+def _draw_cards(rng, num_decks, count):
+    """Tire `count` cartes sans remise dans un sabot de num_decks jeux, pour chaque manche"""
+    n = len(num_decks)
+    rows = np.arange(n)
+    remaining = num_decks[:, None] * _CARDS_PER_DECK[None, :]
+    left = remaining.sum(axis=1)
+    values = np.empty((n, count), dtype=np.int64)
+    
+    for i in range(count):
+        target = (rng.random(n) * left).astype(np.int64)
+        rank = (remaining.cumsum(axis=1) <= target[:, None]).sum(axis=1)
+        values[:, i] = _CARD_VALUES[rank]
+        remaining[rows, rank] -= 1
+        left -= 1
+    
+    return values
+
+
+def _add_card(total, soft, value, mask):
+    total = total + value * mask
+    soft = soft + ((value == 11) & mask)
+    for _ in range(2):
+        fix = (total > 21) & (soft > 0)
+        total = total - 10 * fix
+        soft = soft - fix
+    return total, soft
+
+
+def _draw_until(cards, rows, position, total, soft, limit):
+    """Fait tirer chaque main tant que son total est sous `limit`"""
+    while True:
+        draw = total < limit
+        if not draw.any():
+            return total, position
+        value = cards[rows, np.minimum(position, _CARDS_PER_ROUND - 1)]
+        total, soft = _add_card(total, soft, value, draw)
+        position = position + draw
+
+
+def _blackjack_batch(rng, n, stand_on=17, **_):
+    """Stratégie : tirer tant que le total est sous `stand_on`, sabot de 1 à 8 jeux comme en jeu"""
+    rows = np.arange(n)
+    cards = _draw_cards(rng, rng.integers(1, 9, n), _CARDS_PER_ROUND)
+    zero = np.zeros(n, dtype=np.int64)
+    always = np.ones(n, dtype=bool)
+    
+    player, player_soft = _add_card(*_add_card(zero, zero, cards[:, 0], always), cards[:, 1], always)
+    dealer, dealer_soft = _add_card(*_add_card(zero, zero, cards[:, 2], always), cards[:, 3], always)
+    
+    position = np.full(n, 4)
+    player, position = _draw_until(cards, rows, position, player, player_soft, stand_on)
+    dealer, position = _draw_until(cards, rows, position, dealer, dealer_soft, DEALER_STANDS_ON)
+    
+    # Table des paiements (total joueur, total croupier) construite depuis la règle pure
+    table = np.array([[BLACKJACK_PAYOUTS[blackjack_result(p, d)] for d in range(32)] for p in range(32)],
+                     dtype=np.float64)
+    return table[player, dealer]
+
+
+_BATCHES = {
+    'blackjack': _blackjack_batch,
+    'roulette': _roulette_batch,
+    'minebomb': _minebomb_batch,
+    'slots': _slots_batch,
+}
+
+
+def _run_batch(game, n, seed_sequence, params):
+    """Exécuté dans un processus du pool : renvoie (n, somme, somme des carrés)"""
+    returns = _BATCHES[game](np.random.default_rng(seed_sequence), n, **params)
+    return n, float(returns.sum()), float(np.square(returns).sum())
+
+
+# ============================================
+# API
+# ============================================
+
+def simulate(game, rounds=1_000_000, seed=None, batch_size=DEFAULT_BATCH_SIZE, workers=None, **params):
+    """Joue `rounds` manches et renvoie RTP, variance et intervalle de confiance à 95 %"""
+    if game not in _BATCHES:
+        raise ValueError(f"Jeu inconnu : {game}")
+    
+    batches = [batch_size] * (rounds // batch_size)
+    if rounds % batch_size:
+        batches.append(rounds % batch_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    tasks = [(game, n, seed_sequence, params) for n, seed_sequence in zip(batches, seeds)]
+    
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        results = [_run_batch(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_run_batch, *zip(*tasks)))
+    
+    total = sum(n for n, _, _ in results)
+    mean = sum(s for _, s, _ in results) / total
+    variance = max(sum(sq for _, _, sq in results) / total - mean * mean, 0.0)
+    margin = 1.96 * math.sqrt(variance / total)
+    
+    return {
+        'game': game,
+        'params': params,
+        'rounds': total,
+        'seed': seed,
+        'rtp': mean,
+        'house_edge': 1 - mean,
+        'variance': variance,
+        'std': math.sqrt(variance),
+        'ci95': (mean - margin, mean + margin),
+    }
+
+
+# ============================================
+# CLI
+# ============================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulation Monte Carlo du RTP des jeux")
+    parser.add_argument('game', choices=GAMES + ('all',))
+    parser.add_argument('--rounds', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help="Sortie JSON (une ligne par jeu)")
+    parser.add_argument('--mode', choices=('color', 'number'), default='color', help="Roulette")
+    parser.add_argument('--choice', default=None, help="Roulette : couleur (Red/Black/Green) ou numéro")
+    parser.add_argument('--bombs', type=int, default=5, help="MineBomb")
+    parser.add_argument('--diamonds', type=int, default=3, help="MineBomb : cases révélées avant d'encaisser")
+    parser.add_argument('--bet', type=int, default=100, help="MineBomb : mise (le gain est arrondi à l'entier)")
+    parser.add_argument('--stand-on', type=int, default=17, help="Blackjack : le joueur reste à partir de ce total")
+    args = parser.parse_args(argv)
+    
+    params = {
+        'roulette': {'mode': args.mode, 'choice': args.choice or ('Red' if args.mode == 'color' else '17')},
+        'minebomb': {'bombs': args.bombs, 'diamonds': args.diamonds, 'bet': args.bet},
+        'blackjack': {'stand_on': min(args.stand_on, 21)},
+        'slots': {},
+    }
+    
+    for game in (GAMES if args.game == 'all' else (args.game,)):
+        result = simulate(game, args.rounds, args.seed, args.batch_size, args.workers, **params[game])
+        if args.json:
+            print(json.dumps(result))
+        else:
+            low, high = result['ci95']
+            print(f"{game:<10} RTP {result['rtp']:.4%}  (IC95 {low:.4%} – {high:.4%})  "
+                  f"écart-type {result['std']:.3f}  {result['rounds']:,} manches")
+
+
+if __name__ == '__main__':
+    main()
@@ -19,11 +19,41 @@ let bankCost = 1000;
 // INITIALIZATION
 // ============================================
 document.addEventListener('DOMContentLoaded', () => {
-    loadStats();
     loadClickerData();
     startPassiveIncome();
+    startStream();
 });
 
+// Server push: global stats and balance (the first messages carry the full state)
+function startStream() {
+    if (!window.EventSource) {
+        loadStats();
+        return;
+    }
+    
+    const source = new EventSource('/api/stream');
+    source.onerror = () => {
+        // Refused (503, worker full): poll the stats for a while, then try the stream again
+        if (source.readyState === EventSource.CLOSED) {
+            loadStats();
+            const poll = setInterval(loadStats, 10000);
+            setTimeout(() => {
+                clearInterval(poll);
+                startStream();
+            }, 60000);
+        }
+    };
+    source.addEventListener('stats', (event) => {
+        updateStatsDisplay(JSON.parse(event.data));
+    });
+    source.addEventListener('balance', (event) => {
+        const data = JSON.parse(event.data);
+        passiveIncome = data.passiveIncome;
+        updateMoneyDisplay(data.money + pendingClicks * clickPower);
+        document.getElementById('incomeDisplay').textContent = '+' + passiveIncome + ' $/s';
+    });
+}
+
 async function loadStats() {
     try {
         const response = await fetch('/api/get_stats');
@@ -38,6 +68,7 @@ async function loadClickerData() {
     try {
         const response = await fetch('/api/clicker/get_data');
         const data = await response.json();
+        updateMoneyDisplay(data.money);
         
         clickPower = data.clickPower;
         clickLevel = data.clickLevel;
@@ -161,29 +192,58 @@ function updateStatsDisplay(stats) {
 // ============================================
 // MONEY CLICKER
 // ============================================
-async function doClick() {
+// Clicks are buffered and flushed in batches instead of one request per click
+const CLICK_FLUSH_INTERVAL = 300;
+let pendingClicks = 0;
+let flushingClicks = false;
+
+function doClick() {
+    pendingClicks++;
+    updateMoneyDisplay(currentMoney + clickPower);
+    
+    // Visual feedback
+    const btn = document.getElementById('clickButton');
+    btn.classList.add('clicked');
+    setTimeout(() => btn.classList.remove('clicked'), 100);
+    
+    // Floating number animation
+    showFloatingNumber(clickPower);
+}
+
+async function flushClicks() {
+    if (pendingClicks === 0 || flushingClicks) return;
+    
+    const count = pendingClicks;
+    pendingClicks = 0;
+    flushingClicks = true;
+    
     try {
-        const response = await fetch('/api/clicker/click', {
+        const response = await fetch('/api/clicker/clicks', {
             method: 'POST',
-            headers: {'Content-Type': 'application/json'}
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({count})
         });
         
         const data = await response.json();
-        updateMoneyDisplay(data.money);
-        
-        // Visual feedback
-        const btn = document.getElementById('clickButton');
-        btn.classList.add('clicked');
-        setTimeout(() => btn.classList.remove('clicked'), 100);
-        
-        // Floating number animation
-        showFloatingNumber(clickPower);
-        
+        updateMoneyDisplay(data.money + pendingClicks * clickPower);
     } catch (error) {
         console.error('Click error:', error);
+        pendingClicks += count;
+    } finally {
+        flushingClicks = false;
     }
 }
 
+setInterval(flushClicks, CLICK_FLUSH_INTERVAL);
+
+window.addEventListener('pagehide', () => {
+    if (pendingClicks > 0) {
+        const body = new Blob([JSON.stringify({count: pendingClicks})], {type: 'application/json'});
+        navigator.sendBeacon('/api/clicker/clicks', body);
+        pendingClicks = 0;
+    }
+});
+
 function showFloatingNumber(amount) {
     const container = document.getElementById('floatingNumbers');
     const floatingNum = document.createElement('div');
@@ -197,12 +257,14 @@ function showFloatingNumber(amount) {
     }, 2000);
 }
 
-async function buyUpgrade(type) {
+async function buyUpgrade(type, count = 1) {
+    await flushClicks();
+    
     try {
         const response = await fetch('/api/clicker/upgrade', {
             method: 'POST',
             headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify({type})
+            body: JSON.stringify({type, count})
         });
         
         if (!response.ok) {
@@ -250,19 +312,10 @@ function updateClickerDisplay() {
 }
 
 function startPassiveIncome() {
-    setInterval(async () => {
+    // Projected locally: the server settles passive income whenever money is read or spent
+    setInterval(() => {
         if (passiveIncome > 0) {
-            try {
-                const response = await fetch('/api/clicker/passive', {
-                    method: 'POST',
-                    headers: {'Content-Type': 'application/json'}
-                });
-                
-                const data = await response.json();
-                updateMoneyDisplay(data.money);
-            } catch (error) {
-                console.error('Passive income error:', error);
-            }
+            updateMoneyDisplay(currentMoney + passiveIncome);
         }
     }, 1000);
 }
@@ -358,7 +411,6 @@ async function stand() {
         }
         
         updateMoneyDisplay(data.money);
-        updateStatsDisplay(data.stats);
         
         document.getElementById('hitBtn').disabled = true;
         document.getElementById('standBtn').disabled = true;
@@ -471,7 +523,6 @@ async function spinRoulette() {
             }
             
             updateMoneyDisplay(data.money);
-            updateStatsDisplay(data.stats);
             
             setTimeout(() => {
                 msgDiv.innerHTML = '';
@@ -575,7 +626,6 @@ async function revealCell(index) {
             msgDiv.innerHTML = '💥 BOOM! You lost';
             
             updateMoneyDisplay(data.money);
-            updateStatsDisplay(data.stats);
             
             document.getElementById('cashoutBtn').disabled = true;
             
@@ -608,7 +658,6 @@ async function cashout() {
         const data = await response.json();
         
         updateMoneyDisplay(data.money);
-        updateStatsDisplay(data.stats);
         
         const msgDiv = document.getElementById('mbMessage');
         msgDiv.className = 'message win';
@@ -698,7 +747,6 @@ async function spinSlots() {
             }
             
             updateMoneyDisplay(data.money);
-            updateStatsDisplay(data.stats);
             
             setTimeout(() => {
                 msgDiv.innerHTML = '';
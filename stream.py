@@ -0,0 +1,167 @@
+"""Canal Server-Sent Events (/api/stream) : solde du joueur et stats globales
+
+Un seul thread de diffusion par worker sert tous les abonnés. À chaque tour
+(au plus toutes les STREAM_INTERVAL secondes), il fait deux requêtes quel que
+soit le nombre de clients : les agrégats par jeu, et le solde et le clicker
+de tous les joueurs abonnés à ce worker. Seuls les changements sont poussés ;
+les valeurs d'un même type sont fusionnées en attendant l'envoi, donc un
+client reçoit au plus un message de chaque type par tour.
+
+Chaque commit de ce worker (parties, clics...) réveille le thread ; ceux des
+autres workers sont vus dans les STREAM_POLL_SECONDS secondes. Le revenu passif
+est projeté par le client à partir de `passiveIncome` : seul un changement
+en base provoque un envoi.
+
+Chaque connexion occupe un thread du serveur pendant STREAM_MAX_SECONDS au
+plus (EventSource se reconnecte seul) : workers gthread ou gevent requis.
+Pour que les flux ne prennent pas tous les threads des requêtes de jeu, un
+worker en sert au plus STREAM_MAX_SUBSCRIBERS à la fois ; au-delà, 503 et le
+client se rabat sur /api/get_stats avant de retenter le flux plus tard.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db, User, ClickerData, PASSIVE_ACCRUAL_CAP
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriber:
+    """Messages en attente d'un client, fusionnés par type d'événement"""
+    
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.pending = {}
+        self.ready = threading.Event()
+        self.balance_version = None
+        self._lock = threading.Lock()
+    
+    def push(self, name, data):
+        with self._lock:
+            self.pending[name] = data
+            self.ready.set()
+    
+    def take(self):
+        with self._lock:
+            self.ready.clear()
+            pending, self.pending = self.pending, {}
+        return pending
+
+
+class Broker:
+    """Diffusion unique par worker vers tous les abonnés"""
+    
+    def __init__(self):
+        self.app = None
+        self.stats_loader = None
+        self.max_subscribers = 24
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_stats = None
+    
+    def init_app(self, app, stats_loader):
+        self.app = app
+        self.stats_loader = stats_loader
+        self.interval = app.config.get('STREAM_INTERVAL', 0.5)
+        self.poll_seconds = app.config.get('STREAM_POLL_SECONDS', 2)
+        self.heartbeat = app.config.get('STREAM_HEARTBEAT', 15)
+        self.max_seconds = app.config.get('STREAM_MAX_SECONDS', 60)
+        self.max_subscribers = app.config.get('STREAM_MAX_SUBSCRIBERS', 24)
+    
+    def notify(self):
+        """Demande un tour de diffusion au plus tôt (appelé après un commit)"""
+        self._wake.set()
+    
+    def subscribe(self, user_id):
+        """Nouvel abonné, ou None si le worker sert déjà STREAM_MAX_SUBSCRIBERS flux"""
+        subscriber = Subscriber(user_id)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='stream-broker', daemon=True)
+                self._thread.start()
+        # Premier message : l'état complet
+        if self._last_stats is not None:
+            subscriber.push('stats', self._last_stats)
+        self._wake.set()
+        return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def _run(self):
+        while True:
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+            with self._lock:
+                subscribers = list(self._subscribers)
+            if subscribers:
+                try:
+                    with self.app.app_context():
+                        self._broadcast(subscribers)
+                except Exception:
+                    logger.exception("Échec d'un tour de diffusion SSE")
+            # Limite le débit : au plus un tour par intervalle
+            time.sleep(self.interval)
+    
+    def _broadcast(self, subscribers):
+        stats = self.stats_loader()
+        if stats != self._last_stats:
+            self._last_stats = stats
+            for subscriber in subscribers:
+                subscriber.push('stats', stats)
+        
+        now = datetime.utcnow()
+        rows = db.session.query(User.id, User.money, ClickerData) \
+            .outerjoin(ClickerData, ClickerData.user_id == User.id) \
+            .filter(User.id.in_({subscriber.user_id for subscriber in subscribers})).all()
+        
+        balances = {}
+        for user_id, money, clicker in rows:
+            passive_income = clicker.passive_income if clicker else 0
+            # Solde projeté : revenu passif pas encore réglé en base compris
+            pending = 0
+            if clicker and clicker.last_accrued_at:
+                elapsed = int((now - clicker.last_accrued_at).total_seconds())
+                pending = max(0, min(elapsed, PASSIVE_ACCRUAL_CAP)) * passive_income
+            version = (money, passive_income, clicker.last_accrued_at if clicker else None)
+            balances[user_id] = (version, {'money': money + pending, 'passiveIncome': passive_income})
+        
+        for subscriber in subscribers:
+            version, balance = balances.get(subscriber.user_id, (None, None))
+            if balance is not None and version != subscriber.balance_version:
+                subscriber.balance_version = version
+                subscriber.push('balance', balance)
+    
+    def events(self, subscriber):
+        """Générateur du flux text/event-stream d'un client"""
+        deadline = time.monotonic() + self.max_seconds
+        try:
+            yield f'retry: {int(self.interval * 2000)}\n\n'
+            while time.monotonic() < deadline:
+                if not subscriber.ready.wait(self.heartbeat):
+                    yield ': ping\n\n'
+                    continue
+                for name, data in subscriber.take().items():
+                    yield f'event: {name}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+
+
+broker = Broker()
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_broker(session):
+    broker.notify()
@@ -0,0 +1,54 @@
+"""Améliorations du Money Clicker : prix en forme close, achat par lots
+
+Le n-ième achat (n = 0, 1, 2...) d'une amélioration coûte base × growth^n.
+Un lot de `count` achats à partir de n coûte la somme géométrique
+base × growth^n × (growth^count - 1) / (growth - 1), arrondie à l'inférieur :
+le prix d'un lot et le plus grand lot abordable se calculent en O(1), sans
+boucle par niveau. Seul le niveau est stocké ; le prix s'en déduit.
+"""
+import math
+
+
+class Upgrade:
+    """Une amélioration : colonne de niveau, prix et effet par niveau"""
+    __slots__ = ('column', 'base', 'growth', 'first_level', 'power', 'income')
+    
+    def __init__(self, column, base, growth, first_level=0, power=0, income=0):
+        self.column = column
+        self.base = base
+        self.growth = growth
+        self.first_level = first_level  # Niveau de départ (aucun achat)
+        self.power = power  # Gain par clic par niveau
+        self.income = income  # Revenu passif ($/s) par niveau
+    
+    def purchases(self, level):
+        return level - self.first_level
+    
+    def cost(self, level, count=1):
+        """Prix de `count` niveaux achetés à partir de `level`"""
+        first = self.base * self.growth ** self.purchases(level)
+        return int(first * (self.growth ** count - 1) / (self.growth - 1))
+    
+    def affordable(self, level, money):
+        """Plus grand nombre de niveaux achetables avec `money` à partir de `level`"""
+        first = self.base * self.growth ** self.purchases(level)
+        if money < int(first):
+            return 0
+        count = int(math.log(money * (self.growth - 1) / first + 1, self.growth))
+        # Corrige l'arrondi du logarithme flottant (au plus un cran dans chaque sens)
+        while count > 0 and self.cost(level, count) > money:
+            count -= 1
+        while self.cost(level, count + 1) <= money:
+            count += 1
+        return count
+
+
+UPGRADES = {
+    'click': Upgrade('click_level', base=10, growth=1.5, first_level=1, power=1),
+    'auto': Upgrade('auto_level', base=50, growth=1.8, income=1),
+    'factory': Upgrade('factory_level', base=200, growth=2, income=5),
+    'bank': Upgrade('bank_level', base=1000, growth=2.5, income=20),
+}
+
+# Borne d'un lot « buy N » (les prix dépassent de loin tout solde bien avant)
+MAX_BATCH = 100